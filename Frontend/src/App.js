@@ -82,7 +82,7 @@ function App() {
               msg.id === botMessageId
                 ? { 
                     ...msg, 
-                    text: chunk.text || 'Here is the requested chart.', 
+                    text: msg.text || chunk.text || 'Here is the requested chart.', 
                     type: 'graph', 
                     data: {
                       visualType: 'bar',
@@ -1,58 +1,105 @@
+import { v4 as uuidv4 } from 'uuid';
+
 // Make sure you have a .env file in your Frontend folder with:
 // REACT_APP_API_URL=http://127.0.0.1:8000/api/v1
 const API_URL = `${process.env.REACT_APP_API_URL}/chat`;
+const MAX_RESUME_ATTEMPTS = 3;
+
+// One session per browser tab (kept across reloads); a new question cancels the
+// session's unfinished answer on the server, so tabs must not share an id
+const getSessionId = () => {
+  let sessionId = sessionStorage.getItem('chatSessionId');
+  if (!sessionId) {
+    sessionId = uuidv4();
+    sessionStorage.setItem('chatSessionId', sessionId);
+  }
+  return sessionId;
+};
+
+// Parses one "\n\n"-terminated SSE block into { id, data }; comments (heartbeats) yield null data
+const parseEvent = (block) => {
+  let id = null;
+  const dataLines = [];
+  for (const line of block.split('\n')) {
+    if (line.startsWith('id: ')) id = line.substring(4);
+    else if (line.startsWith('data: ')) dataLines.push(line.substring(6));
+  }
+  return { id, data: dataLines.length ? dataLines.join('\n') : null };
+};
 
 export const streamMessageFromBackend = async (message, selectedTools, onChunk) => {
-  try {
-    const response = await fetch(API_URL, {
-      method: 'POST',
-      headers: {
+  let lastEventId = null;
+  let finished = false;
+
+  for (let attempt = 0; attempt <= MAX_RESUME_ATTEMPTS && !finished; attempt++) {
+    try {
+      const headers = {
         'Content-Type': 'application/json',
         'Accept': 'text/event-stream'
-      },
-      body: JSON.stringify({
-        // Note: Your backend schema uses 'query', not 'prompt'. Let's match it.
-        session_id: 'some-unique-session-id', // You can generate this
-        query: message,
-        include_visualization: selectedTools.includes('graph'), // Example logic
-        // language and context can be added here if needed
-      }),
-    });
-
-    if (!response.body) {
-      throw new Error("Response body is null.");
-    }
+      };
+      // After a dropped connection, resume the same answer instead of asking again
+      if (lastEventId) headers['Last-Event-ID'] = lastEventId;
+
+      const response = await fetch(API_URL, {
+        method: 'POST',
+        headers,
+        body: JSON.stringify({
+          // Note: Your backend schema uses 'query', not 'prompt'. Let's match it.
+          session_id: getSessionId(),
+          query: message,
+          include_visualization: selectedTools.includes('graph'), // Example logic
+          // language and context can be added here if needed
+        }),
+      });
 
-    const reader = response.body.getReader();
-    const decoder = new TextDecoder();
-
-    // Instead of processing line by line, process larger chunks:
-    while (true) {
-      const { done, value } = await reader.read();
-      if (done) break;
-      
-      const chunk = decoder.decode(value, { stream: true });
-      
-      // Process immediately instead of buffering
-      if (chunk.startsWith('data: ')) {
-        const jsonString = chunk.substring(6);
-        try {
-          const jsonObject = JSON.parse(jsonString);
-          onChunk(jsonObject);
-        } catch (e) {
-          onChunk(chunk.substring(6));
+      if (!response.body) {
+        throw new Error("Response body is null.");
+      }
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+        const blocks = buffer.split('\n\n');
+        buffer = blocks.pop(); // Keep the incomplete tail for the next read
+
+        for (const block of blocks) {
+          const { id, data } = parseEvent(block);
+          if (id) lastEventId = id;
+          if (data === null) continue;
+
+          const event = JSON.parse(data);
+          if (event.type === 'done') {
+            finished = true;
+          } else if (event.type === 'answer' && event.suggested_queries) {
+            // Non-data intents (greeting, help, off-topic) come with questions to try next
+            onChunk({ type: 'text', text: event.text, suggestedQueries: event.suggested_queries });
+          } else if (event.type === 'answer') {
+            onChunk(event.text);
+          } else if (event.type === 'graph') {
+            onChunk({ ...event, data: event.data.chartData });
+          } else {
+            onChunk(event);
+          }
         }
-      } else if (chunk.trim()) {
-        onChunk(chunk);
+      }
+      // A stream that closed without 'done' was cut off; loop round to resume it
+      if (!finished && !lastEventId) break;
+    } catch (error) {
+      console.error("Error communicating with the backend:", error);
+      if (attempt === MAX_RESUME_ATTEMPTS || !lastEventId) {
+        onChunk({
+          type: 'error',
+          text: "Sorry, I'm having trouble connecting to the server. Please try again later.",
+          errorDetails: error.message
+        });
+        return;
       }
     }
-
-  } catch (error) {
-    console.error("Error communicating with the backend:", error);
-    onChunk({
-      type: 'error',
-      text: "Sorry, I'm having trouble connecting to the server. Please try again later.",
-      errorDetails: error.message
-    });
   }
-};
\ No newline at end of file
+};
@@ -27,6 +27,7 @@ const ChatWindow = ({ messages, isLoading, loadingStatus, onSendMessage }) => {
   };
 
   const statusInfo = loadingStatus ? getStatusIcon(loadingStatus) : null;
+  const lastMessage = messages[messages.length - 1];
 
   return (
     <main className="chat-window">
@@ -36,6 +37,9 @@ const ChatWindow = ({ messages, isLoading, loadingStatus, onSendMessage }) => {
       {messages.length === 1 && !isLoading && (
         <SuggestedQuestions onQuestionClick={onSendMessage} />
       )}
+      {lastMessage?.suggestedQueries && !isLoading && (
+        <SuggestedQuestions questions={lastMessage.suggestedQueries} onQuestionClick={onSendMessage} />
+      )}
       {(isLoading || loadingStatus) && (
         <>
           {statusInfo ? (
@@ -1,17 +1,98 @@
-from fastapi import APIRouter
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException, Request, status
 from starlette.responses import StreamingResponse  # Import StreamingResponse
-from .schemas import ChatRequest  # We no longer use ChatResponse here
+from .schemas import ChatRequest, BatchChatRequest, ExportRequest, QueryIntentResponse  # We no longer use ChatResponse here
+from ..config import settings
 from ..services import ChatService
+from ..exceptions import database_error_exception
+from ..export import export_rows, MEDIA_TYPES
+from ..intent import classify_intent
+from ..sse import ChatStream, encode_stream, parse_last_event_id, stream_registry
 
 router = APIRouter()
 
+def _sse_response(stream: ChatStream, after_seq: int, http_request: Request) -> StreamingResponse:
+    compress = settings.SSE_COMPRESSION and "gzip" in http_request.headers.get("accept-encoding", "")
+    headers = {
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # Stop proxies from buffering the stream
+        "X-Stream-Id": stream.stream_id,
+    }
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        encode_stream(stream.read_from(after_seq), compress),
+        media_type="text/event-stream",
+        headers=headers
+    )
+
 @router.post("/chat", tags=["Chat"])
-async def process_chat_stream(request: ChatRequest):  # Renamed for clarity
+async def process_chat_stream(
+    request: ChatRequest,
+    http_request: Request,
+    last_event_id: Optional[str] = Header(None)
+):  # Renamed for clarity
     """
-    Receives a user query and streams back an AI-generated response.
+    Receives a user query and streams back an AI-generated response. A client
+    reconnecting with Last-Event-ID resumes the original stream instead of
+    re-running the pipeline.
     """
+    resume = parse_last_event_id(last_event_id)
+    stream = stream_registry.get(resume[0]) if resume else None
+    if stream is not None:
+        return _sse_response(stream, resume[1], http_request)
+
     chat_service = ChatService()
+    return _sse_response(chat_service.start_stream(request), -1, http_request)
+
+@router.get("/chat/stream/{stream_id}", tags=["Chat"])
+async def resume_chat_stream(stream_id: str, http_request: Request, last_event_id: Optional[str] = Header(None)):
+    """
+    Re-attaches to a running or recently finished response stream (EventSource-friendly).
+    """
+    stream = stream_registry.get(stream_id)
+    if stream is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Stream not found or expired")
+    resume = parse_last_event_id(last_event_id)
+    after_seq = resume[1] if resume and resume[0] == stream_id else -1
+    return _sse_response(stream, after_seq, http_request)
+
+@router.post("/intent", tags=["Chat"], response_model=QueryIntentResponse)
+def detect_intent(request: ChatRequest):
+    """
+    Classifies a query locally, without calling the LLM or the database.
+    """
+    return classify_intent(request.query)
+
+@router.post("/chat/batch", tags=["Chat"])
+async def process_chat_batch(request: BatchChatRequest):
+    """
+    Answers a list of queries and streams each result back as it completes.
+    """
+    chat_service = ChatService()
+    media_type = "text/event-stream" if request.format == "sse" else "application/x-ndjson"
+    return StreamingResponse(
+        chat_service.generate_batch_stream(request),
+        media_type=media_type
+    )
+
+@router.post("/data/export", tags=["Data"])
+def export_data(request: ExportRequest):
+    """
+    Streams the raw rows matching the filters as CSV or NDJSON.
+    """
+    headers = {"Content-Disposition": f'attachment; filename="ingres_export.{request.format}"'}
+    if request.compress:
+        headers["Content-Encoding"] = "gzip"
+
+    try:
+        chunks = export_rows(request.filters, request.format, request.compress)
+    except Exception:
+        # Nothing has been sent yet, so the client gets a proper error status
+        raise database_error_exception("Export failed: database unavailable")
+
     return StreamingResponse(
-        chat_service.generate_streaming_response(request), 
-        media_type="text/event-stream"
-    )
\ No newline at end of file
+        chunks,
+        media_type=MEDIA_TYPES[request.format],
+        headers=headers
+    )
@@ -1,6 +1,15 @@
 from pydantic import BaseModel, Field, field_validator  # Change import
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Literal
 from datetime import datetime
+from ..config import settings
+
+def _check_dangerous_patterns(v: str) -> str:
+    dangerous_patterns = ['drop', 'delete', 'update', 'insert', 'alter', 'create', 'truncate']
+    v_lower = v.lower()
+    for pattern in dangerous_patterns:
+        if pattern in v_lower:
+            raise ValueError(f"Query contains potentially harmful operation: {pattern}")
+    return v
 
 class ChatRequest(BaseModel):
     """
@@ -16,13 +25,36 @@ class ChatRequest(BaseModel):
     @classmethod  # Add this decorator
     def validate_query(cls, v: str) -> str:  # Add type annotations
         """Validate query for basic security"""
-        dangerous_patterns = ['drop', 'delete', 'update', 'insert', 'alter', 'create', 'truncate']
-        v_lower = v.lower()
-        for pattern in dangerous_patterns:
-            if pattern in v_lower:
-                raise ValueError(f"Query contains potentially harmful operation: {pattern}")
+        return _check_dangerous_patterns(v)
+
+class BatchChatRequest(BaseModel):
+    """
+    Defines the structure of a request to the /chat/batch endpoint.
+    """
+    session_id: str = Field(..., min_length=1, max_length=100, description="Unique session identifier")
+    queries: List[str] = Field(..., min_length=1, description="User queries to answer")
+    format: Literal["ndjson", "sse"] = Field("ndjson", description="Streaming format for per-item results")
+
+    @field_validator('queries')
+    @classmethod
+    def validate_queries(cls, v: List[str]) -> List[str]:
+        """Apply the single-query validation to every item"""
+        if len(v) > settings.BATCH_MAX_QUERIES:
+            raise ValueError(f"Batch exceeds the maximum of {settings.BATCH_MAX_QUERIES} queries")
+        for query in v:
+            if not 1 <= len(query) <= 1000:
+                raise ValueError("Each query must be between 1 and 1000 characters")
+            _check_dangerous_patterns(query)
         return v
 
+class ExportRequest(BaseModel):
+    """
+    Defines the structure of a request to the /data/export endpoint.
+    """
+    filters: Dict[str, Any] = Field(default_factory=dict, description="Same filter structure accepted by execute_query")
+    format: Literal["csv", "ndjson"] = Field("csv", description="Output format")
+    compress: bool = Field(False, description="Gzip-compress the streamed body")
+
 class ChatResponse(BaseModel):
     """
     Defines the response from the /chat endpoint.
@@ -55,6 +87,7 @@ class HealthResponse(BaseModel):
     version: str
     timestamp: datetime = Field(default_factory=datetime.now)
     services: Optional[Dict[str, str]] = None
+    details: Optional[Dict[str, Any]] = None
 
 class QueryIntentResponse(BaseModel):
     """
@@ -0,0 +1,156 @@
+import asyncio
+import json
+import time
+from typing import Dict
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+from .schemas import ChatRequest
+from ..cancellation import cancellation_scope
+from ..config import settings
+from ..logger import get_logger
+from ..services import ChatService
+
+logger = get_logger(__name__)
+
+router = APIRouter()
+
+class ChatConnection:
+    """
+    One WebSocket carrying several concurrent conversations. Every outbound
+    event is tagged with the client's message id, and all of them go through
+    a bounded send buffer: when the client reads slowly the buffer fills and
+    the pipelines producing events wait, instead of queueing without limit.
+    Control replies (pongs, pings, protocol errors) use a small separate
+    queue that never blocks, so the reader keeps handling `cancel` messages
+    while a slow client has the send buffer full.
+
+    Client messages:
+      {"type": "chat", "id": "...", "session_id": "...", "query": "...", ...ChatRequest fields}
+      {"type": "cancel", "id": "..."}
+      {"type": "ping"} / {"type": "pong"}
+    """
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.chat_service = ChatService()
+        self.send_buffer: asyncio.Queue = asyncio.Queue(maxsize=settings.WS_SEND_BUFFER)
+        self.control_buffer: asyncio.Queue = asyncio.Queue(maxsize=settings.WS_CONTROL_BUFFER)
+        self._pending = asyncio.Event()
+        self.conversations: Dict[str, asyncio.Task] = {}
+        self.last_seen = time.monotonic()
+
+    async def run(self) -> None:
+        writer = asyncio.create_task(self._writer())
+        keepalive = asyncio.create_task(self._keepalive())
+        await self.send({"type": "ready", "max_conversations": settings.WS_MAX_CONVERSATIONS})
+        try:
+            await self._reader()
+        except WebSocketDisconnect:
+            logger.info("WebSocket client disconnected")
+        finally:
+            for task in self.conversations.values():
+                task.cancel(msg="client_disconnect")
+            writer.cancel()
+            keepalive.cancel()
+
+    async def send(self, event: dict) -> None:
+        # Blocks when the buffer is full, which is what pushes back on the pipelines
+        await self.send_buffer.put(event)
+        self._pending.set()
+
+    def send_control(self, event: dict) -> None:
+        """Queues a control reply without waiting; dropped if the client is not reading at all."""
+        try:
+            self.control_buffer.put_nowait(event)
+        except asyncio.QueueFull:
+            logger.warning(f"WebSocket control buffer full; dropping {event.get('type')} message")
+            return
+        self._pending.set()
+
+    async def _writer(self) -> None:
+        while True:
+            # Control replies go first, ahead of any backlog of conversation events
+            if not self.control_buffer.empty():
+                event = self.control_buffer.get_nowait()
+            elif not self.send_buffer.empty():
+                event = self.send_buffer.get_nowait()
+            else:
+                self._pending.clear()
+                await self._pending.wait()
+                continue
+            await self.websocket.send_text(json.dumps(event, default=str))
+
+    async def _keepalive(self) -> None:
+        while True:
+            await asyncio.sleep(settings.WS_PING_INTERVAL)
+            if time.monotonic() - self.last_seen > settings.WS_PING_TIMEOUT:
+                logger.warning("WebSocket keepalive timed out; closing connection")
+                await self.websocket.close(code=1001)
+                return
+            self.send_control({"type": "ping"})
+
+    async def _reader(self) -> None:
+        while True:
+            raw = await self.websocket.receive_text()
+            self.last_seen = time.monotonic()
+            try:
+                message = json.loads(raw)
+            except json.JSONDecodeError:
+                self.send_control({"type": "error", "text": "Messages must be JSON objects"})
+                continue
+            if not isinstance(message, dict):
+                self.send_control({"type": "error", "text": "Messages must be JSON objects"})
+                continue
+
+            message_type = message.get("type")
+            if message_type == "chat":
+                self._start_conversation(message)
+            elif message_type == "cancel":
+                task = self.conversations.get(str(message.get("id")))
+                if task:
+                    task.cancel(msg="client_cancel")
+            elif message_type == "ping":
+                self.send_control({"type": "pong"})
+            elif message_type != "pong":
+                self.send_control({"type": "error", "id": message.get("id"), "text": f"Unknown message type: {message_type}"})
+
+    def _start_conversation(self, message: dict) -> None:
+        conversation_id = str(message.get("id") or "")
+        if not conversation_id:
+            self.send_control({"type": "error", "text": "Chat messages need an 'id'"})
+            return
+        if conversation_id in self.conversations:
+            self.send_control({"type": "error", "id": conversation_id, "text": "A conversation with this id is already running"})
+            return
+        if len(self.conversations) >= settings.WS_MAX_CONVERSATIONS:
+            self.send_control({"type": "error", "id": conversation_id, "text": "Too many concurrent conversations on this connection"})
+            return
+
+        try:
+            request = ChatRequest(**{key: value for key, value in message.items() if key not in ("type", "id")})
+        except ValidationError as e:
+            self.send_control({"type": "error", "id": conversation_id, "text": "Invalid chat request", "errorDetails": str(e)})
+            return
+
+        task = asyncio.create_task(self._converse(conversation_id, request))
+        self.conversations[conversation_id] = task
+        task.add_done_callback(lambda _: self.conversations.pop(conversation_id, None))
+
+    async def _converse(self, conversation_id: str, request: ChatRequest) -> None:
+        try:
+            with cancellation_scope():
+                async for event in self.chat_service.stream_events(request):
+                    await self.send({"id": conversation_id, **event})
+            await self.send({"type": "done", "id": conversation_id})
+        except asyncio.CancelledError:
+            # Best effort: the connection may already be gone
+            self.send_control({"type": "cancelled", "id": conversation_id})
+            raise
+
+@router.websocket("/ws/chat")
+async def chat_websocket(websocket: WebSocket):
+    """
+    Long-lived chat transport multiplexing several conversations per connection.
+    """
+    await websocket.accept()
+    await ChatConnection(websocket).run()
@@ -0,0 +1,318 @@
+# app/cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Any, Callable, Dict, Optional
+from .config import settings
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+_MISSING = object()
+
+# Values larger than this are zlib-compressed before they are stored
+_COMPRESS_THRESHOLD = 512
+_RAW, _COMPRESSED = b"\x00", b"\x01"
+
+def _json_default(value: Any) -> Any:
+    # DB rows carry NUMERIC columns as Decimal
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Cannot cache value of type {type(value).__name__}")
+
+def serialize(value: Any) -> bytes:
+    """
+    Compact binary encoding: JSON, zlib-compressed when that pays off. JSON
+    rather than pickle, so a tampered cache file cannot run code on load.
+    """
+    data = json.dumps(value, default=_json_default, separators=(",", ":")).encode("utf-8")
+    if len(data) > _COMPRESS_THRESHOLD:
+        return _COMPRESSED + zlib.compress(data, 6)
+    return _RAW + data
+
+def deserialize(blob: bytes) -> Any:
+    data = blob[1:]
+    if blob[:1] == _COMPRESSED:
+        data = zlib.decompress(data)
+    return json.loads(data)
+
+def cache_key(namespace: str, *parts: Any) -> str:
+    """Builds a fixed-length key from a namespace and arbitrary parts."""
+    digest = hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=16).hexdigest()
+    return f"{namespace}:{digest}"
+
+class CacheBackend(ABC):
+    """
+    Interface for all cache tiers. A factory result of None is never
+    stored, so failed lookups are retried on the next call.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    @abstractmethod
+    def get(self, key: str, default: Any = None) -> Any:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def size(self) -> int:
+        ...
+
+    def get_or_set(self, key: str, factory: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        value = factory()
+        if value is not None:
+            self.set(key, value, ttl)
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": type(self).__name__, "entries": self.size(), "hits": self.hits, "misses": self.misses}
+
+    def _expiry(self, ttl: Optional[float]) -> float:
+        ttl = settings.CACHE_DEFAULT_TTL if ttl is None else ttl
+        return time.time() + ttl
+
+class NullCache(CacheBackend):
+    """Caching disabled: every lookup misses."""
+
+    def get(self, key: str, default: Any = None) -> Any:
+        self.misses += 1
+        return default
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        pass
+
+    def delete(self, key: str) -> None:
+        pass
+
+    def size(self) -> int:
+        return 0
+
+class LRUCache(CacheBackend):
+    """In-process tier: thread-safe LRU with per-entry expiry."""
+
+    def __init__(self, max_entries: int):
+        super().__init__()
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._entries[key] = (value, self._expiry(ttl))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def size(self) -> int:
+        return len(self._entries)
+
+class SQLiteCache(CacheBackend):
+    """
+    Host-local tier shared by every worker process on the machine: a SQLite
+    file in WAL mode, so readers never block the single writer. get_or_set is
+    first-writer-wins (INSERT ... ON CONFLICT DO NOTHING, then read back), so
+    concurrent workers converge on one stored value without holding a lock
+    while the value is being computed.
+    """
+
+    def __init__(self, path: str, max_entries: int):
+        super().__init__()
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_expires_at ON cache (expires_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread and per process (connections must not cross a fork)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str, default: Any = None) -> Any:
+        row = self._connection().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return default
+        try:
+            value = deserialize(row[0])
+        except (ValueError, zlib.error) as e:
+            # Unreadable entry (corrupt or not written by us): drop it and recompute
+            logger.warning(f"Discarding unreadable cache entry {key}: {e}")
+            self.delete(key)
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self._connection().execute(
+            "INSERT INTO cache (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+            (key, serialize(value), self._expiry(ttl))
+        )
+        self._after_write()
+
+    def get_or_set(self, key: str, factory: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        value = factory()
+        if value is None:
+            return None
+        conn = self._connection()
+        now = time.time()
+        # Keep whichever live value landed first; replace only an expired one
+        conn.execute(
+            "INSERT INTO cache (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at "
+            "WHERE cache.expires_at <= ?",
+            (key, serialize(value), self._expiry(ttl), now)
+        )
+        self._after_write()
+        row = conn.execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone()
+        try:
+            return deserialize(row[0]) if row else value
+        except (ValueError, zlib.error):
+            return value
+
+    def delete(self, key: str) -> None:
+        self._connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def size(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def _after_write(self) -> None:
+        # Amortize eviction: drop expired entries, then the soonest-expiring over the cap
+        self._writes += 1
+        if self._writes % 100:
+            return
+        conn = self._connection()
+        conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+        conn.execute(
+            "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+class TieredCache(CacheBackend):
+    """In-process LRU in front of the shared host-local tier."""
+
+    def __init__(self, local: CacheBackend, shared: CacheBackend, local_ttl: float):
+        super().__init__()
+        self.local = local
+        self.shared = shared
+        self.local_ttl = local_ttl
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self.local.get(key, _MISSING)
+        if value is _MISSING:
+            value = self.shared.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self.local.set(key, value, self.local_ttl)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.shared.set(key, value, ttl)
+        self.local.set(key, value, min(self.local_ttl, ttl) if ttl is not None else self.local_ttl)
+
+    def get_or_set(self, key: str, factory: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+        value = self.shared.get_or_set(key, factory, ttl)
+        if value is not None:
+            self.local.set(key, value, min(self.local_ttl, ttl) if ttl is not None else self.local_ttl)
+        return value
+
+    def delete(self, key: str) -> None:
+        self.local.delete(key)
+        self.shared.delete(key)
+
+    def size(self) -> int:
+        return self.shared.size()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "TieredCache", "local": self.local.stats(), "shared": self.shared.stats()}
+
+_cache: Optional[CacheBackend] = None
+_cache_lock = threading.Lock()
+
+def _build_cache() -> CacheBackend:
+    backend = settings.CACHE_BACKEND.lower()
+    if backend == "none":
+        return NullCache()
+    if backend == "memory":
+        return LRUCache(settings.CACHE_MAX_ENTRIES)
+
+    if backend not in ("sqlite", "tiered"):
+        raise ValueError(f"Unknown CACHE_BACKEND: {settings.CACHE_BACKEND}")
+    # No shared default: a guessable file in a world-writable directory could be planted by another user
+    if not settings.CACHE_SQLITE_PATH:
+        raise ValueError(f"CACHE_SQLITE_PATH must be set for CACHE_BACKEND={backend}")
+    shared = SQLiteCache(settings.CACHE_SQLITE_PATH, settings.CACHE_MAX_ENTRIES)
+    if backend == "sqlite":
+        return shared
+    return TieredCache(LRUCache(settings.CACHE_LOCAL_MAX_ENTRIES), shared, settings.CACHE_LOCAL_TTL)
+
+def get_cache() -> CacheBackend:
+    """Returns the configured cache backend, built on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    _cache = _build_cache()
+                except Exception as e:
+                    logger.error(f"Cache backend unavailable, caching disabled: {e}")
+                    _cache = NullCache()
+    return _cache
@@ -0,0 +1,176 @@
+# app/cancellation.py
+# Cancellation tokens reaching into worker threads. asyncio.to_thread copies
+# the calling task's context, so blocking LLM/DB code can find the token of
+# the pipeline it runs for and register how to abort itself.
+import asyncio
+import contextvars
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+from .exceptions import RequestCancelledError
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+# Pipeline stages in order; the ones not started when a pipeline is cancelled are work saved
+PIPELINE_STAGES = ("nlu", "db", "nlg")
+
+class CancelToken:
+    """Runs the registered abort callbacks, once, when the pipeline is cancelled."""
+
+    def __init__(self):
+        self.cancelled = False
+        self.stage: Optional[str] = None
+        self._callbacks: Dict[int, Callable[[], None]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def cancel(self) -> None:
+        with self._lock:
+            if self.cancelled:
+                return
+            self.cancelled = True
+            callbacks = list(self._callbacks.values())
+            self._callbacks.clear()
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"Abort callback failed: {e}")
+
+    def add_callback(self, callback: Callable[[], None]) -> Optional[int]:
+        """Registers callback; runs it immediately (returning None) if already cancelled."""
+        with self._lock:
+            if not self.cancelled:
+                self._next_id += 1
+                self._callbacks[self._next_id] = callback
+                return self._next_id
+        callback()
+        return None
+
+    def remove_callback(self, handle: Optional[int]) -> None:
+        with self._lock:
+            self._callbacks.pop(handle, None)
+
+    def register(self, abort: Callable[[], None]) -> "Registration":
+        """Registers abort as a revocable callback; see Registration."""
+        registration = Registration(self, abort)
+        registration.handle = self.add_callback(registration)
+        return registration
+
+class Registration:
+    """
+    An abort callback bound to a resource (a connection) this pipeline is
+    using. The callback and release() share a lock: once release() returns
+    the abort can no longer run, and a release() racing a running abort
+    waits for it, so a resource handed back to a pool is never aborted on
+    behalf of its previous user.
+    """
+
+    def __init__(self, token: CancelToken, abort: Callable[[], None]):
+        self.token = token
+        self.handle: Optional[int] = None
+        self._abort = abort
+        self._active = True
+        self._lock = threading.Lock()
+
+    def __call__(self) -> None:
+        with self._lock:
+            if self._active:
+                self._abort()
+
+    def release(self) -> None:
+        with self._lock:
+            self._active = False
+        self.token.remove_callback(self.handle)
+
+current_cancel_token: contextvars.ContextVar[Optional[CancelToken]] = contextvars.ContextVar("cancel_token", default=None)
+
+class CancellationStats:
+    """Counts cancelled pipelines and the upstream work they did not have to finish."""
+
+    def __init__(self):
+        self.pipelines = Counter()
+        self.skipped_stages = Counter()
+        self.http_requests_aborted = 0
+        self.db_queries_cancelled = 0
+        self._lock = threading.Lock()
+
+    def record_pipeline(self, reason: str, stage: Optional[str]) -> None:
+        started = PIPELINE_STAGES.index(stage) + 1 if stage in PIPELINE_STAGES else 0
+        with self._lock:
+            self.pipelines[reason] += 1
+            self.skipped_stages.update(PIPELINE_STAGES[started:])
+
+    def record_http_abort(self) -> None:
+        with self._lock:
+            self.http_requests_aborted += 1
+
+    def record_db_cancel(self) -> None:
+        with self._lock:
+            self.db_queries_cancelled += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "pipelines": dict(self.pipelines),
+            "skipped_stages": dict(self.skipped_stages),
+            "http_requests_aborted": self.http_requests_aborted,
+            "db_queries_cancelled": self.db_queries_cancelled,
+        }
+
+cancellation_stats = CancellationStats()
+
+# Aborts get their own threads: the default executor is where the blocked LLM/DB
+# calls being aborted run, and when they fill it an abort queued there would wait for them
+_abort_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="abort")
+
+@contextmanager
+def cancellation_scope() -> Iterator[CancelToken]:
+    """
+    Gives the enclosed pipeline a token and fires it if the task running the
+    pipeline is cancelled. Cancel the task with a msg to label the reason.
+    """
+    token = CancelToken()
+    reset = current_cancel_token.set(token)
+    try:
+        yield token
+    except asyncio.CancelledError as e:
+        reason = e.args[0] if e.args else "cancelled"
+        cancellation_stats.record_pipeline(reason, token.stage)
+        logger.info(f"Pipeline cancelled ({reason}) during stage '{token.stage}'")
+        # Aborts block (psycopg2's cancel opens a connection), so keep them off the event loop
+        asyncio.get_running_loop().run_in_executor(_abort_executor, token.cancel)
+        raise
+    finally:
+        current_cancel_token.reset(reset)
+
+def enter_stage(stage: str) -> None:
+    """Marks the pipeline stage now running, for the skipped-work metrics."""
+    token = current_cancel_token.get()
+    if token is not None:
+        token.stage = stage
+
+@contextmanager
+def on_cancel(abort: Callable[[], None]) -> Iterator[None]:
+    """
+    Calls abort (from the cancelling thread) if the current pipeline is
+    cancelled while the block runs. Raises RequestCancelledError up front
+    when it already was, so no new work starts.
+    """
+    token = current_cancel_token.get()
+    if token is None:
+        yield
+        return
+    if token.cancelled:
+        raise RequestCancelledError("Pipeline was cancelled")
+    registration = token.register(abort)
+    try:
+        yield
+    finally:
+        registration.release()
+
+def is_cancelled() -> bool:
+    token = current_cancel_token.get()
+    return token is not None and token.cancelled
@@ -1,4 +1,5 @@
 # app/config.py
+from functools import lru_cache
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from typing import Optional, List
 
@@ -15,10 +16,14 @@ class Settings(BaseSettings):
     LOG_LEVEL: str = "INFO"  
     LOG_FORMAT: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     
-    # API Keys
-    LLM_API_KEY: str
-    BHASHINI_API_KEY: str
-    SARVAM_API_KEY: str
+    # API Keys (checked when the client that needs them is first used)
+    LLM_API_KEY: Optional[str] = None
+    BHASHINI_API_KEY: Optional[str] = None
+    SARVAM_API_KEY: Optional[str] = None
+
+    # LLM circuit breaker
+    LLM_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    LLM_CIRCUIT_RESET_TIMEOUT: float = 30.0
 
     # Database Configuration
     db_user: str = "user"
@@ -29,6 +34,7 @@ class Settings(BaseSettings):
     DATABASE_URL: Optional[str] = None
     DATABASE_POOL_SIZE: int = 10
     DATABASE_MAX_OVERFLOW: int = 20
+    DATABASE_CONNECT_TIMEOUT: int = 5
 
     @property
     def get_database_url(self) -> str:
@@ -36,10 +42,92 @@ class Settings(BaseSettings):
             return self.DATABASE_URL
         return f"postgresql://{self.db_user}:{self.db_password}@{self.db_host}:{self.db_port}/{self.db_name}?sslmode=require"
 
+    # Read Routing (reads go to the fastest healthy of these, plus the primary)
+    DATABASE_READ_URLS: List[str] = []
+    DATABASE_READ_INCLUDE_PRIMARY: bool = True
+    DATABASE_PROBE_INTERVAL: float = 10.0
+    DATABASE_PROBE_TIMEOUT: float = 2.0
+    DATABASE_LATENCY_EWMA_ALPHA: float = 0.3
+    DATABASE_NODE_RETRY_INTERVAL: float = 30.0
+    DATABASE_SNAPSHOT_FALLBACK: bool = False
+    DATABASE_SNAPSHOT_PATH: str = "data/ingres_snapshot.json"
+
     # Security
     API_RATE_LIMIT: str = "100/minute"
     MAX_QUERY_LENGTH: int = 1000
+    QUERY_MAX_LIMIT: int = 1000
     ALLOWED_SQL_OPERATIONS: Optional[List[str]] = ["SELECT", "INSERT", "UPDATE", "DELETE"]
 
-# Create a single instance of the settings
-settings = Settings()
\ No newline at end of file
+    # Intent Routing
+    INTENT_MODEL_PATH: Optional[str] = None
+    INTENT_MODEL_THRESHOLD: float = 0.8
+
+    # Speculative Prefetch
+    SPECULATIVE_PREFETCH: bool = True
+
+    # Batch Chat
+    BATCH_MAX_QUERIES: int = 500
+    BATCH_CONCURRENCY: int = 8
+
+    # Caching ("none", "memory", "sqlite" or "tiered" = memory in front of sqlite)
+    CACHE_BACKEND: str = "memory"
+    CACHE_SQLITE_PATH: Optional[str] = None  # Required for "sqlite"/"tiered"; use an app-owned directory
+    CACHE_MAX_ENTRIES: int = 10000
+    CACHE_LOCAL_MAX_ENTRIES: int = 1000
+    CACHE_LOCAL_TTL: float = 60.0
+    CACHE_DEFAULT_TTL: float = 3600.0
+    CACHE_NLU_TTL: float = 86400.0
+    CACHE_ANSWER_TTL: float = 3600.0
+    CACHE_GAZETTEER_TTL: float = 86400.0
+    # Backoff between background gazetteer loads after a failure (doubling up to the max)
+    GAZETTEER_RETRY_INTERVAL: float = 5.0
+    GAZETTEER_RETRY_MAX: float = 300.0
+
+    # Server-Sent Events
+    SSE_HEARTBEAT_INTERVAL: float = 15.0
+    SSE_RETRY_MS: int = 3000
+    SSE_REPLAY_TTL: float = 120.0
+    SSE_REPLAY_MAX_EVENTS: int = 256
+    SSE_ABANDON_GRACE: float = 10.0
+    SSE_COMPRESSION: bool = False
+    SSE_GZIP_LEVEL: int = 6
+
+    # WebSocket Chat
+    WS_MAX_CONVERSATIONS: int = 4
+    WS_SEND_BUFFER: int = 64
+    WS_CONTROL_BUFFER: int = 16
+    WS_PING_INTERVAL: float = 20.0
+    WS_PING_TIMEOUT: float = 60.0
+
+    # Data Export
+    EXPORT_BATCH_SIZE: int = 500
+    EXPORT_GZIP_LEVEL: int = 6
+
+    # Tracing / profiling
+    ADMIN_API_TOKEN: Optional[str] = None
+    TRACE_SAMPLE_RATE: float = 0.0
+    TRACE_OUTPUT_DIR: str = "traces"
+
+    # Health checks
+    HEALTH_DB_PING_TTL: float = 5.0
+    HEALTH_DB_PING_TIMEOUT: float = 2.0
+
+    # Startup
+    WARMUP_ENABLED: bool = True
+    WARMUP_STEPS: List[str] = ["database", "llm", "gazetteer", "intent_model", "snapshot"]
+    WARMUP_DB_CONNECTIONS: int = 2
+    WARMUP_TIMEOUT: float = 10.0
+
+@lru_cache
+def get_settings() -> Settings:
+    """Build the settings on first use instead of at import time."""
+    return Settings()
+
+class _LazySettings:
+    """Module-level stand-in that defers reading the environment until a setting is accessed."""
+
+    def __getattr__(self, name: str):
+        return getattr(get_settings(), name)
+
+# Create a single (lazy) instance of the settings
+settings = _LazySettings()
\ No newline at end of file
@@ -1,44 +1,382 @@
 
+import operator
+import threading
+from functools import lru_cache
+from typing import Callable, Iterator, List, Optional, TypeVar
 from sqlalchemy import create_engine, text
+from sqlalchemy.sql.elements import TextClause
+from sqlalchemy.engine import Connection, Engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from .cancellation import cancellation_stats, is_cancelled, on_cancel
 from .config import settings
 from .logger import get_logger
+from .replicas import NoReadNodeAvailable, ReadNode, ReadRouter, postgres_connect_args
+from .snapshot import load_snapshot
+from .tracing import span, traced
 
 logger = get_logger(__name__)
 
-# Database setup
-SQLALCHEMY_DATABASE_URL = settings.get_database_url
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+T = TypeVar("T")
+
+# Database setup (the engine is created on first use, not at import)
 Base = declarative_base()
+_engine: Optional[Engine] = None
+_session_factory: Optional[sessionmaker] = None
+_read_router: Optional[ReadRouter] = None
+_engine_lock = threading.Lock()
 
-def execute_query(filters: dict) -> list:
+def get_engine() -> Engine:
     """
-    Safely builds and executes a SQL query on the "ingressdata2025" table.
+    Returns the shared engine, creating it and its connection pool on first use.
+    """
+    global _engine, _session_factory
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_engine(
+                    settings.get_database_url,
+                    pool_size=settings.DATABASE_POOL_SIZE,
+                    max_overflow=settings.DATABASE_MAX_OVERFLOW,
+                    pool_pre_ping=True,
+                    connect_args=postgres_connect_args(settings.get_database_url)
+                )
+                _session_factory = sessionmaker(autocommit=False, autoflush=False, bind=_engine)
+    return _engine
+
+def get_sessionmaker() -> sessionmaker:
+    get_engine()
+    return _session_factory
+
+def dispose_engine() -> None:
+    """
+    Closes every pooled connection and forgets the engine (shutdown / after fork).
+    """
+    global _engine, _session_factory, _read_router
+    with _engine_lock:
+        if _read_router is not None:
+            _read_router.dispose()
+        if _engine is not None:
+            _engine.dispose()
+        _engine = None
+        _session_factory = None
+        _read_router = None
+
+def get_read_router() -> ReadRouter:
+    """
+    Returns the router over DATABASE_READ_URLS (and the primary), built on first use.
+    """
+    global _read_router
+    if _read_router is None:
+        with _engine_lock:
+            if _read_router is None:
+                nodes = [ReadNode(url) for url in settings.DATABASE_READ_URLS]
+                if settings.DATABASE_READ_INCLUDE_PRIMARY or not nodes:
+                    nodes.append(ReadNode(settings.get_database_url, engine_factory=get_engine))
+                _read_router = ReadRouter(nodes)
+    return _read_router
+
+def routed_read(read: Callable[[Connection], T], fallback: Optional[Callable[[List[dict]], T]] = None) -> T:
+    """
+    Runs read(conn) on the best database node. When every node is down and
+    DATABASE_SNAPSHOT_FALLBACK is on, fallback answers from the snapshot rows.
+    """
+    try:
+        return get_read_router().run(read)
+    except NoReadNodeAvailable:
+        if fallback is None or not settings.DATABASE_SNAPSHOT_FALLBACK:
+            raise
+        logger.warning("No database node available; answering from the local snapshot")
+        return fallback(load_snapshot())
+
+def _statement_canceller(conn: Connection) -> Callable[[], None]:
+    # psycopg2 sends a cancel request to the server; sqlite3 interrupts in-process
+    dbapi_connection = conn.connection.dbapi_connection
+    cancel = getattr(dbapi_connection, "cancel", None) or getattr(dbapi_connection, "interrupt", None)
+
+    def abort() -> None:
+        if cancel is not None:
+            cancel()
+            cancellation_stats.record_db_cancel()
+    return abort
+
+def read_dicts(statement, params: Optional[dict] = None) -> Callable[[Connection], List[dict]]:
+    """
+    Builds a routed_read callable returning rows as dicts. Cancelling the
+    current pipeline cancels the statement on the server.
+    """
+    def read(conn: Connection) -> List[dict]:
+        with on_cancel(_statement_canceller(conn)):
+            result = conn.execute(statement, params or {})
+            columns = result.keys()
+            return [dict(zip(columns, row)) for row in result.fetchall()]
+    return read
+
+def __getattr__(name: str):
+    # Keep `from app.db import engine, SessionLocal` working without building them at import
+    if name == "engine":
+        return get_engine()
+    if name == "SessionLocal":
+        return get_sessionmaker()
+    if name == "SQLALCHEMY_DATABASE_URL":
+        return settings.get_database_url
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Columns returned for every row of the "ingressdata2025" table
+COLUMNS = [
+    "STATES", "DISTRICT", "RainfallTotal", "AnnualGroundwaterRechargeTotal",
+    "AnnualExtractableGroundwaterResourceTotal", "GroundWaterExtractionforAllUsesTotal",
+    "StageofGroundWaterExtractionTotal", "NetAnnualGroundWaterAvailabilityforFutureUseTotal"
+]
+
+# Numeric columns that may be compared, ordered and ranked on
+NUMERIC_COLUMNS = [column for column in COLUMNS if column not in ("STATES", "DISTRICT")]
+
+# Whitelisted comparison operators (NLU spelling -> SQL)
+COMPARISON_OPERATORS = {">": ">", ">=": ">=", "<": "<", "<=": "<=", "=": "=", "!=": "<>"}
+
+# The same operators for rows evaluated in memory (snapshot fallback)
+PYTHON_OPERATORS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le, "=": operator.eq, "!=": operator.ne}
+
+def _normalize_filters(filters: dict) -> tuple:
+    """
+    Validates the filter JSON and splits it into the statement shape (what the
+    SQL looks like) and the bound parameters. Anything outside the whitelist
+    is dropped with a warning rather than interpolated into SQL.
     """
-    # Use all relevant columns from the table
-    query_builder = ['SELECT "STATES", "DISTRICT", "RainfallTotal", "AnnualGroundwaterRechargeTotal", "AnnualExtractableGroundwaterResourceTotal", "GroundWaterExtractionforAllUsesTotal", "StageofGroundWaterExtractionTotal", "NetAnnualGroundWaterAvailabilityforFutureUseTotal" FROM public."ingressdata2025" WHERE 1=1']
     params = {}
+    conditions = []
+    order = None
+    has_limit = False
 
     # Dynamically and safely add filters from the JSON
     if 'state' in filters:
-        query_builder.append('AND "STATES" ILIKE :state')
         params['state'] = f"%{filters['state']}%"
 
     if 'district' in filters:
-        query_builder.append('AND "DISTRICT" ILIKE :district')
         params['district'] = f"%{filters['district']}%"
-    
-    # You can add more filters here for other columns as needed...
 
-    final_query = " ".join(query_builder)
+    for condition in filters.get('conditions') or []:
+        field = condition.get('field') if isinstance(condition, dict) else None
+        op = condition.get('op') if isinstance(condition, dict) else None
+        if field not in NUMERIC_COLUMNS or op not in COMPARISON_OPERATORS:
+            logger.warning(f"Ignoring unsupported filter condition: {condition}")
+            continue
+        try:
+            value = float(condition.get('value'))
+        except (TypeError, ValueError):
+            logger.warning(f"Ignoring non-numeric filter condition: {condition}")
+            continue
+        params[f"c{len(conditions)}"] = value
+        conditions.append((field, op))
 
-    with SessionLocal() as session:
+    order_by = filters.get('order_by')
+    if isinstance(order_by, dict) and order_by.get('field') in NUMERIC_COLUMNS:
+        direction = "ASC" if str(order_by.get('direction', 'desc')).lower() == "asc" else "DESC"
+        order = (order_by['field'], direction)
+    elif order_by:
+        logger.warning(f"Ignoring unsupported order_by: {order_by}")
+
+    if filters.get('limit') is not None:
         try:
-            result = session.execute(text(final_query), params)
-            columns = result.keys()
-            results_as_dict = [dict(zip(columns, row)) for row in result.fetchall()]
-            return results_as_dict
-        except Exception as e:
+            params['limit'] = max(1, min(int(filters['limit']), settings.QUERY_MAX_LIMIT))
+            has_limit = True
+        except (TypeError, ValueError):
+            logger.warning(f"Ignoring non-integer limit: {filters['limit']}")
+
+    shape = ('state' in params, 'district' in params, tuple(conditions), order, has_limit)
+    return shape, params
+
+@lru_cache(maxsize=256)
+def _compile_statement(shape: tuple) -> TextClause:
+    """
+    Builds the parameterized statement for one filter shape. Each distinct
+    shape is built once; reusing the same construct also lets SQLAlchemy
+    reuse its compiled form.
+    """
+    has_state, has_district, conditions, order, has_limit = shape
+
+    # Use all relevant columns from the table
+    column_sql = ", ".join(f'"{column}"' for column in COLUMNS)
+    query_builder = [f'SELECT {column_sql} FROM public."ingressdata2025" WHERE 1=1']
+
+    if has_state:
+        query_builder.append('AND "STATES" ILIKE :state')
+
+    if has_district:
+        query_builder.append('AND "DISTRICT" ILIKE :district')
+
+    for index, (field, op) in enumerate(conditions):
+        query_builder.append(f'AND "{field}" {COMPARISON_OPERATORS[op]} :c{index}')
+
+    if order:
+        # Both directions keep NULLs last (as filter_rows does); ensure_ranking_indexes
+        # builds a matching index per direction, so top-N and bottom-N are index scans
+        query_builder.append(f'ORDER BY "{order[0]}" {order[1]} NULLS LAST')
+
+    if has_limit:
+        query_builder.append('LIMIT :limit')
+
+    return text(" ".join(query_builder))
+
+def _build_query(filters: dict) -> tuple:
+    """
+    Returns the cached statement and bound parameters for the given filters.
+    """
+    shape, params = _normalize_filters(filters)
+    return _compile_statement(shape), params
+
+def has_ranking_filters(filters: dict) -> bool:
+    """True when the filters use numeric conditions, ordering or a limit."""
+    return bool(filters.get('conditions') or filters.get('order_by') or filters.get('limit') is not None)
+
+def ensure_ranking_indexes() -> None:
+    """
+    Creates two indexes per numeric column, one for each ORDER BY direction
+    _compile_statement emits, so ranking and range questions run as index
+    scans instead of sorting the whole table.
+    """
+    with get_engine().begin() as conn:
+        for column in NUMERIC_COLUMNS:
+            conn.execute(text(
+                f'CREATE INDEX IF NOT EXISTS "ix_ingressdata2025_{column.lower()}" '
+                f'ON public."ingressdata2025" ("{column}" DESC NULLS LAST)'
+            ))
+            # "ASC NULLS LAST" is not the backward scan of "DESC NULLS LAST", so it needs its own index
+            conn.execute(text(
+                f'CREATE INDEX IF NOT EXISTS "ix_ingressdata2025_{column.lower()}_asc" '
+                f'ON public."ingressdata2025" ("{column}" ASC NULLS LAST)'
+            ))
+
+@traced("db.execute_query")
+def execute_query(filters: dict) -> list:
+    """
+    Safely builds and executes a SQL query on the "ingressdata2025" table.
+    """
+    statement, params = _build_query(filters)
+
+    try:
+        return routed_read(read_dicts(statement, params), lambda rows: filter_rows(rows, filters))
+    except Exception as e:
+        if is_cancelled():
+            logger.info("Database query cancelled")
+        else:
             logger.error(f"Database query failed: {e}")
-            return []
\ No newline at end of file
+        return []
+
+@traced("db.execute_batch_query")
+def execute_batch_query(filters_list: list) -> list:
+    """
+    Executes a single query covering every filter set in the batch, using
+    ILIKE ANY over the distinct states/districts. The result is a superset
+    of each item's rows; use rows_matching_filters to split it back up.
+    Only location filters are merged; see has_ranking_filters.
+    """
+    if not filters_list or any(not _has_location_filter(f) for f in filters_list):
+        # At least one item is unfiltered, so the whole table is needed anyway
+        return execute_query({})
+
+    # Items with a district are covered by the district predicate; the rest by state
+    districts = sorted({f"%{f['district']}%" for f in filters_list if 'district' in f})
+    states = sorted({f"%{f['state']}%" for f in filters_list if 'district' not in f})
+
+    column_sql = ", ".join(f'"{column}"' for column in COLUMNS)
+    predicates = []
+    params = {}
+    if states:
+        predicates.append('"STATES" ILIKE ANY(:states)')
+        params['states'] = states
+    if districts:
+        predicates.append('"DISTRICT" ILIKE ANY(:districts)')
+        params['districts'] = districts
+
+    final_query = f'SELECT {column_sql} FROM public."ingressdata2025" WHERE {" OR ".join(predicates)}'
+
+    def from_snapshot(rows: List[dict]) -> List[dict]:
+        return [row for row in rows if any(rows_matching_filters([row], f) for f in filters_list)]
+
+    try:
+        return routed_read(read_dicts(text(final_query), params), from_snapshot)
+    except Exception as e:
+        logger.error(f"Batch database query failed: {e}")
+        return []
+
+def _has_location_filter(filters: dict) -> bool:
+    return 'state' in filters or 'district' in filters
+
+def rows_matching_filters(rows: list, filters: dict) -> list:
+    """
+    Applies the same case-insensitive substring semantics as the ILIKE
+    filters in _build_query to rows that are already in memory.
+    """
+    state = str(filters['state']).lower() if 'state' in filters else None
+    district = str(filters['district']).lower() if 'district' in filters else None
+
+    return [
+        row for row in rows
+        if (state is None or state in str(row.get("STATES") or "").lower())
+        and (district is None or district in str(row.get("DISTRICT") or "").lower())
+    ]
+
+def filter_rows(rows: list, filters: dict) -> list:
+    """
+    Evaluates the full filter JSON (locations, conditions, order_by, limit)
+    over in-memory rows, with the same semantics as the SQL from _build_query.
+    """
+    shape, params = _normalize_filters(filters)
+    _, _, conditions, order, has_limit = shape
+
+    matched = rows_matching_filters(rows, filters)
+    for index, (field, op) in enumerate(conditions):
+        # NULL never satisfies a comparison in SQL
+        matched = [
+            row for row in matched
+            if row.get(field) is not None and PYTHON_OPERATORS[op](float(row[field]), params[f"c{index}"])
+        ]
+    if order:
+        field, direction = order
+        present = sorted(
+            (row for row in matched if row.get(field) is not None),
+            key=lambda row: float(row[field]), reverse=direction == "DESC"
+        )
+        matched = present + [row for row in matched if row.get(field) is None]
+    if has_limit:
+        matched = matched[:params['limit']]
+    return matched
+
+def fetch_locations() -> list:
+    """
+    Returns every distinct (state, district) pair in the table.
+    """
+    final_query = 'SELECT DISTINCT "STATES", "DISTRICT" FROM public."ingressdata2025"'
+
+    def read(conn: Connection) -> list:
+        return [{"state": row[0], "district": row[1]} for row in conn.execute(text(final_query)).fetchall()]
+
+    def from_snapshot(rows: List[dict]) -> list:
+        pairs = dict.fromkeys((row.get("STATES"), row.get("DISTRICT")) for row in rows)
+        return [{"state": state, "district": district} for state, district in pairs]
+
+    return routed_read(read, from_snapshot)
+
+def stream_query(filters: dict, batch_size: Optional[int] = None) -> Iterator[list]:
+    """
+    Executes the same query as execute_query but streams the rows back in
+    batches using a server-side cursor, so memory stays flat for large results.
+    """
+    statement, params = _build_query(filters)
+    batch_size = batch_size or settings.EXPORT_BATCH_SIZE
+
+    try:
+        with get_read_router().connection() as conn:
+            with span("db.stream_query.execute"):
+                result = conn.execution_options(yield_per=batch_size).execute(statement, params)
+            columns = list(result.keys())
+            for partition in result.partitions():
+                yield [dict(zip(columns, row)) for row in partition]
+    except NoReadNodeAvailable:
+        if not settings.DATABASE_SNAPSHOT_FALLBACK:
+            raise
+        logger.warning("No database node available; streaming from the local snapshot")
+        rows = filter_rows(load_snapshot(), filters)
+        for start in range(0, len(rows), batch_size):
+            yield rows[start:start + batch_size]
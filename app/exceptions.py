@@ -27,6 +27,10 @@ class RateLimitExceededError(INGRESChatbotException):
     """Raised when API rate limit is exceeded"""
     pass
 
+class RequestCancelledError(INGRESChatbotException):
+    """Raised when in-flight work is abandoned because its client went away"""
+    pass
+
 # HTTP Exception handlers
 def create_http_exception(status_code: int, detail: str, error_type: str = "GENERAL_ERROR", headers: Optional[dict] = None):
     """Create standardized HTTP exception"""
@@ -0,0 +1,88 @@
+# app/export.py
+import csv
+import io
+import json
+import zlib
+from decimal import Decimal
+from typing import Iterable, Iterator, List
+from .config import settings
+from .db import COLUMNS, stream_query
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+def _json_default(value):
+    """Serialize database types that json does not understand natively."""
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+def encode_csv(batches: Iterable[List[dict]]) -> Iterator[bytes]:
+    """Encode row batches as CSV, one chunk per batch, header first."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    yield buffer.getvalue().encode("utf-8")
+
+    for batch in batches:
+        buffer.seek(0)
+        buffer.truncate(0)
+        writer.writerows(batch)
+        yield buffer.getvalue().encode("utf-8")
+
+def encode_ndjson(batches: Iterable[List[dict]]) -> Iterator[bytes]:
+    """Encode row batches as newline-delimited JSON, one chunk per batch."""
+    for batch in batches:
+        lines = [json.dumps(row, default=_json_default) for row in batch]
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+def gzip_chunks(chunks: Iterable[bytes], level: int) -> Iterator[bytes]:
+    """Compress a chunk stream incrementally into a single gzip member."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def export_rows(filters: dict, fmt: str = "csv", compress: bool = False) -> Iterator[bytes]:
+    """
+    Streams every row matching the filters in the requested format without
+    materializing the result set. The query runs and its first batch is
+    fetched before this returns, so connection failures raise here, while
+    an error response can still be sent.
+    """
+    logger.info(f"Starting {fmt} export with filters: {filters} | gzip: {compress}")
+    encoder = encode_csv if fmt == "csv" else encode_ndjson
+    rows = stream_query(filters)
+    try:
+        first_batch = next(rows, None)
+    except Exception as e:
+        logger.error(f"Export failed before the first row: {e}")
+        raise
+
+    def batches():
+        row_count = 0
+        try:
+            if first_batch is not None:
+                row_count += len(first_batch)
+                yield first_batch
+            for batch in rows:
+                row_count += len(batch)
+                yield batch
+        except Exception as e:
+            # Headers are already on the wire: re-raise so the response is aborted
+            # instead of ending cleanly and passing for a complete export
+            logger.error(f"Export aborted after {row_count} rows: {e}")
+            raise
+        logger.info(f"Export finished: {row_count} rows")
+
+    chunks = encoder(batches())
+    if compress:
+        chunks = gzip_chunks(chunks, settings.EXPORT_GZIP_LEVEL)
+    return chunks
@@ -0,0 +1,81 @@
+# app/gazetteer.py
+import threading
+import time
+from typing import Dict, List, Optional
+from .cache import cache_key, get_cache
+from .config import settings
+from .db import fetch_locations
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+# Known state/district names, loaded from the database on first use
+_gazetteer: Optional[Dict[str, List]] = None
+_gazetteer_lock = threading.Lock()
+
+# Background loading for callers that must not wait on the database
+_loading = False
+_load_failures = 0
+_next_load_at = 0.0
+_load_state_lock = threading.Lock()
+
+def get_gazetteer(refresh: bool = False) -> Dict[str, List]:
+    """
+    Returns the known locations as {"states": [...], "districts": [{"state", "district"}, ...]}.
+    """
+    global _gazetteer
+    if _gazetteer is None or refresh:
+        with _gazetteer_lock:
+            if _gazetteer is None or refresh:
+                # Shared across workers, so only one of them has to hit the database
+                key = cache_key("gazetteer")
+                if refresh:
+                    get_cache().delete(key)
+                locations = get_cache().get_or_set(key, fetch_locations, ttl=settings.CACHE_GAZETTEER_TTL)
+                _gazetteer = {
+                    "states": sorted({loc["state"] for loc in locations if loc["state"]}),
+                    "districts": [loc for loc in locations if loc["district"]],
+                }
+                logger.info(
+                    f"Loaded gazetteer: {len(_gazetteer['states'])} states, "
+                    f"{len(_gazetteer['districts'])} districts"
+                )
+    return _gazetteer
+
+def loaded_gazetteer() -> Optional[Dict[str, List]]:
+    """
+    Returns the gazetteer if it is already loaded, without blocking. Otherwise
+    starts loading it in the background (backing off after failures) and
+    returns None.
+    """
+    if _gazetteer is None:
+        _start_background_load()
+    return _gazetteer
+
+def _start_background_load() -> None:
+    global _loading
+    with _load_state_lock:
+        if _loading or time.monotonic() < _next_load_at:
+            return
+        _loading = True
+    threading.Thread(target=_background_load, name="gazetteer-load", daemon=True).start()
+
+def _background_load() -> None:
+    global _loading, _load_failures, _next_load_at
+    try:
+        get_gazetteer()
+        _load_failures = 0
+    except Exception as e:
+        _load_failures += 1
+        delay = min(settings.GAZETTEER_RETRY_INTERVAL * 2 ** (_load_failures - 1), settings.GAZETTEER_RETRY_MAX)
+        _next_load_at = time.monotonic() + delay
+        logger.warning(f"Gazetteer load failed ({e}); retrying in {delay:.0f}s at the earliest")
+    finally:
+        with _load_state_lock:
+            _loading = False
+
+def gazetteer_size() -> int:
+    """Number of cached location entries (0 until the gazetteer is loaded)."""
+    if _gazetteer is None:
+        return 0
+    return len(_gazetteer["states"]) + len(_gazetteer["districts"])
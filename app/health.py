@@ -0,0 +1,99 @@
+# app/health.py
+import asyncio
+import time
+from typing import Any, Dict, Tuple
+from .cache import get_cache
+from .cancellation import cancellation_stats
+from .config import settings
+from .db import get_engine, get_read_router
+from .gazetteer import gazetteer_size
+from .lifecycle import startup_timings
+from .llm_utils import CircuitBreaker, get_llm_circuit
+from .logger import get_logger
+from .middleware import in_flight_requests
+from .prefetch import prefetch_stats
+from .sse import stream_registry
+
+logger = get_logger(__name__)
+
+class DatabasePinger:
+    """
+    Probes the read nodes with `SELECT 1` and caches the result, so that
+    frequent probes from the load balancer do not each cost a database
+    query. Health comes from the read router, which reads also update.
+    """
+
+    def __init__(self):
+        self.checked_at: float = 0.0
+        self._lock = asyncio.Lock()
+
+    async def status(self) -> Dict[str, Any]:
+        if time.monotonic() - self.checked_at >= settings.HEALTH_DB_PING_TTL:
+            async with self._lock:
+                # Another probe may have refreshed it while we waited
+                if time.monotonic() - self.checked_at >= settings.HEALTH_DB_PING_TTL:
+                    await self._refresh()
+        router = get_read_router()
+        healthy_nodes = [node for node in router.nodes if node.healthy]
+        latencies = [node.latency_ms for node in healthy_nodes if node.latency_ms is not None]
+        return {
+            "healthy": bool(healthy_nodes),
+            "latency_ms": round(min(latencies), 2) if latencies else None,
+            "error": None if healthy_nodes else "; ".join(f"{node.name}: {node.error}" for node in router.nodes),
+            "age_seconds": round(time.monotonic() - self.checked_at, 2),
+        }
+
+    async def _refresh(self) -> None:
+        try:
+            await asyncio.wait_for(get_read_router().probe_all(), timeout=settings.HEALTH_DB_PING_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning("Database probe timed out")
+        self.checked_at = time.monotonic()
+
+db_pinger = DatabasePinger()
+
+def get_pool_stats() -> Dict[str, int]:
+    try:
+        pool = get_engine().pool
+    except Exception as e:
+        logger.warning(f"Could not read pool stats: {e}")
+        return {}
+    stats = {}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        # Not every pool class (e.g. SQLite's) implements all counters
+        if hasattr(pool, name):
+            stats[name] = getattr(pool, name)()
+    return stats
+
+async def readiness_report() -> Tuple[bool, Dict[str, str], Dict[str, Any]]:
+    """
+    Returns (ready, per-service status, detailed stats) for the readiness probe.
+    """
+    database = await db_pinger.status()
+    circuit = get_llm_circuit()
+
+    router = get_read_router()
+
+    services = {
+        # Reads keep working while any read node is up, even if the primary is not
+        "database": "healthy" if database["healthy"] else "unhealthy",
+        "llm": "healthy" if circuit.state != CircuitBreaker.OPEN else "unhealthy",
+    }
+    details = {
+        "database": {**database, "pool": get_pool_stats(), "read_routing": router.stats()},
+        "llm": {
+            "circuit_state": circuit.state,
+            "consecutive_failures": circuit.consecutive_failures,
+        },
+        "caches": {
+            "gazetteer": gazetteer_size(),
+            "sse_replay_streams": len(stream_registry),
+            "shared": get_cache().stats(),
+        },
+        "in_flight_requests": dict(in_flight_requests),
+        "speculative_prefetch": prefetch_stats.snapshot(),
+        "cancellations": cancellation_stats.snapshot(),
+        "startup_timings": {name: round(seconds, 3) for name, seconds in startup_timings.items()},
+    }
+    ready = all(status == "healthy" for status in services.values())
+    return ready, services, details
@@ -0,0 +1,125 @@
+# app/intent.py
+import pickle
+import re
+import threading
+from typing import Optional
+from .api.schemas import QueryIntentResponse
+from .config import settings
+from .logger import get_logger
+
+try:
+    # Optional: preferred loader for scikit-learn pipelines
+    import joblib
+except ImportError:
+    joblib = None
+
+logger = get_logger(__name__)
+
+# Intents answered locally, without the LLM or the database
+GREETING = "greeting"
+THANKS = "thanks"
+GOODBYE = "goodbye"
+HELP = "help"
+UNSUPPORTED = "unsupported"
+DATA = "data"
+
+SUGGESTED_QUERIES = [
+    "Show me all groundwater data for Bengaluru Urban, Karnataka",
+    "What is the stage of groundwater extraction in Chennai?",
+    "Top 10 most over-exploited districts in Punjab",
+    "How has Jaipur's groundwater extraction changed since 2017?",
+]
+
+CANNED_RESPONSES = {
+    GREETING: "Hello! I'm the INGRES groundwater assistant. Ask me about rainfall, recharge, extraction or availability for any state or district in India.",
+    THANKS: "You're welcome! Let me know if you'd like to look up another district or state.",
+    GOODBYE: "Goodbye! Come back any time you need groundwater data.",
+    HELP: (
+        "I answer questions about India's groundwater assessment (INGRES) data. For any state or district I can report "
+        "rainfall, annual groundwater recharge, extractable resource, total extraction, stage of extraction and "
+        "availability for future use. I can also rank districts, filter by thresholds and describe multi-year trends."
+    ),
+    UNSUPPORTED: "Sorry, I can only help with groundwater data from the INGRES assessment. Try one of the suggested questions below.",
+}
+
+# Whole-message chit-chat patterns; anything longer is treated as a real question
+_CHIT_CHAT_RULES = [
+    (GREETING, re.compile(r"^(hi+|hello|hey|hiya|namaste|namaskar|good (morning|afternoon|evening))( there)?[\s!.,]*$")),
+    (THANKS, re.compile(r"^(thanks?|thank you|thx|ty|great|awesome|ok(ay)?|cool)( (so much|a lot|very much))?[\s!.,]*$")),
+    (GOODBYE, re.compile(r"^(bye|goodbye|see you|see ya|good night)[\s!.,]*$")),
+    (HELP, re.compile(r"^(help|what can you do|what do you do|how (do i|to) use (this|you)|who are you|what are you)\??[\s!.]*$")),
+]
+
+_DATA_KEYWORDS = re.compile(
+    r"groundwater|ground water|rainfall|recharge|extraction|extractable|aquifer|water|district|state|"
+    r"exploited|critical|safe|data|level|stage|availability|trend|ingres"
+)
+
+_UNSUPPORTED_KEYWORDS = re.compile(
+    r"\b(weather|forecast|news|cricket|football|movie|song|joke|stock|share price|bitcoin|recipe|"
+    r"election|president|prime minister|write (a|an|me)|code|python|translate)\b"
+)
+
+_VISUALIZATION_KEYWORDS = re.compile(r"\b(chart|graph|plot|visuali[sz]e|compare|comparison|top \d+)\b")
+
+class IntentClassifier:
+    """
+    Keyword/regex rules, optionally backed by a small scikit-learn style
+    model (anything with predict_proba and classes_) loaded at startup.
+    """
+
+    def __init__(self):
+        self.model = None
+        self._lock = threading.Lock()
+
+    def load_model(self, path: Optional[str] = None) -> None:
+        path = path or settings.INTENT_MODEL_PATH
+        if not path:
+            return
+        with self._lock:
+            if joblib is not None:
+                self.model = joblib.load(path)
+            else:
+                with open(path, "rb") as f:
+                    self.model = pickle.load(f)
+        logger.info(f"Loaded intent model from {path}")
+
+    def classify(self, query: str) -> QueryIntentResponse:
+        text = " ".join(query.lower().split())
+        intent, confidence = self._classify_text(text)
+        return QueryIntentResponse(
+            intent=intent,
+            entities=[],
+            confidence=confidence,
+            requires_visualization=intent == DATA and bool(_VISUALIZATION_KEYWORDS.search(text)),
+            suggested_queries=None if intent == DATA else SUGGESTED_QUERIES
+        )
+
+    def _classify_text(self, text: str):
+        for intent, pattern in _CHIT_CHAT_RULES:
+            if pattern.match(text):
+                return intent, 1.0
+
+        has_data_keyword = bool(_DATA_KEYWORDS.search(text))
+        if not has_data_keyword and _UNSUPPORTED_KEYWORDS.search(text):
+            return UNSUPPORTED, 0.9
+
+        if self.model is not None and not has_data_keyword:
+            try:
+                probabilities = self.model.predict_proba([text])[0]
+                best = max(range(len(probabilities)), key=lambda i: probabilities[i])
+                if probabilities[best] >= settings.INTENT_MODEL_THRESHOLD:
+                    return str(self.model.classes_[best]), float(probabilities[best])
+            except Exception as e:
+                logger.warning(f"Intent model failed, falling back to rules: {e}")
+
+        # When in doubt, let the full pipeline answer
+        return DATA, 0.6 if not has_data_keyword else 0.95
+
+intent_classifier = IntentClassifier()
+
+def classify_intent(query: str) -> QueryIntentResponse:
+    return intent_classifier.classify(query)
+
+def canned_response(intent: QueryIntentResponse) -> str:
+    return CANNED_RESPONSES.get(intent.intent, CANNED_RESPONSES[UNSUPPORTED])
@@ -0,0 +1,112 @@
+# app/lifecycle.py
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Callable, Dict
+from fastapi import FastAPI
+from sqlalchemy import text
+from .config import settings
+from .db import get_engine, get_read_router, dispose_engine
+from .gazetteer import get_gazetteer
+from .intent import intent_classifier
+from .llm_utils import API_BASE_URL, get_http_session, close_http_session
+from .logger import get_logger
+from .snapshot import load_snapshot
+
+logger = get_logger(__name__)
+
+# Seconds spent in each startup step, reported in the logs (and available to health checks)
+startup_timings: Dict[str, float] = {}
+
+def warm_database() -> None:
+    """Open WARMUP_DB_CONNECTIONS pooled connections so the first requests skip the TCP/TLS handshake."""
+    engine = get_engine()
+    connections = []
+    try:
+        for _ in range(settings.WARMUP_DB_CONNECTIONS):
+            conn = engine.connect()
+            conn.execute(text("SELECT 1"))
+            connections.append(conn)
+    finally:
+        # Closing returns them to the pool, still open
+        for conn in connections:
+            conn.close()
+
+def warm_llm() -> None:
+    """Resolve DNS and complete the TLS handshake to Sarvam AI on the shared session."""
+    get_http_session().head(API_BASE_URL, timeout=10)
+
+def warm_gazetteer() -> None:
+    get_gazetteer()
+
+def warm_intent_model() -> None:
+    """Load the optional intent model (INTENT_MODEL_PATH), if one is configured."""
+    intent_classifier.load_model()
+
+def warm_snapshot() -> None:
+    """Parse the database snapshot now, so a failover to it does not pay for that on a request."""
+    if not settings.DATABASE_SNAPSHOT_FALLBACK:
+        return
+    if not os.path.exists(settings.DATABASE_SNAPSHOT_PATH):
+        logger.info(f"No database snapshot at {settings.DATABASE_SNAPSHOT_PATH}; run python -m app.snapshot to create one")
+        return
+    load_snapshot()
+
+WARMUP_STEPS: Dict[str, Callable[[], None]] = {
+    "database": warm_database,
+    "llm": warm_llm,
+    "gazetteer": warm_gazetteer,
+    "intent_model": warm_intent_model,
+    "snapshot": warm_snapshot,
+}
+
+async def _timed_step(name: str, step: Callable[[], None]) -> None:
+    start_time = time.perf_counter()
+    success = True
+    try:
+        # Bounded: an unreachable dependency must not hold up serving (including /health/live)
+        await asyncio.wait_for(asyncio.to_thread(step), timeout=settings.WARMUP_TIMEOUT)
+    except asyncio.TimeoutError:
+        success = False
+        logger.warning(f"Warmup step '{name}' timed out after {settings.WARMUP_TIMEOUT}s")
+    except Exception as e:
+        # Warmup is best effort; the request path builds anything that is missing
+        success = False
+        logger.warning(f"Warmup step '{name}' failed: {e}")
+    startup_timings[name] = time.perf_counter() - start_time
+    status = "SUCCESS" if success else "ERROR"
+    logger.info(f"WARMUP | {name} | Time: {startup_timings[name]:.3f}s | Status: {status}")
+
+async def run_warmup() -> None:
+    """Run the configured warmup steps concurrently."""
+    steps = []
+    for name in settings.WARMUP_STEPS:
+        if name not in WARMUP_STEPS:
+            logger.warning(f"Unknown warmup step '{name}' ignored")
+            continue
+        steps.append(_timed_step(name, WARMUP_STEPS[name]))
+    await asyncio.gather(*steps)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    FastAPI lifespan hook: warm external dependencies before serving, and
+    release pooled connections on shutdown.
+    """
+    start_time = time.perf_counter()
+    if settings.WARMUP_ENABLED:
+        await run_warmup()
+    startup_timings["total"] = time.perf_counter() - start_time
+    logger.info(f"Startup complete in {startup_timings['total']:.3f}s")
+
+    # With read replicas configured, keep their health and latency current for routing
+    probe_task = asyncio.create_task(get_read_router().probe_forever()) if settings.DATABASE_READ_URLS else None
+
+    yield
+
+    if probe_task is not None:
+        probe_task.cancel()
+    close_http_session()
+    dispose_engine()
+    logger.info("Shutdown complete")
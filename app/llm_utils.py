@@ -1,33 +1,222 @@
 # --- PART 1: SETUP ---
 
-import os
+import socket
+import threading
+import time
 import requests
 import json
-from dotenv import load_dotenv
+from typing import Optional
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from .cancellation import cancellation_stats, current_cancel_token, is_cancelled
+from .config import settings
+from .exceptions import LLMServiceError, RequestCancelledError
 from .logger import get_logger
+from .tracing import span
 
 # Initialize logger
 logger = get_logger(__name__)
 
-# Load variables from your .env file
-load_dotenv()
+# Define the API details from the documentation
+API_BASE_URL = "https://api.sarvam.ai"
+API_URL = f"{API_BASE_URL}/v1/chat/completions"
+MODEL_IDENTIFIER = "sarvam-m"
 
-# Get the API Key from the environment by its NAME
-SARVAM_API_KEY = os.environ.get("SARVAM_API_KEY")
+# Year of the "ingressdata2025" snapshot; the default end of open-ended trend questions
+CURRENT_ASSESSMENT_YEAR = 2025
 
-# Check if the key was loaded successfully
-if not SARVAM_API_KEY:
-    raise ValueError("API key not found. Please set the SARVAM_API_KEY in your .env file.")
+# Fallback answers returned by the NLG functions when the LLM call fails
+NLG_EMPTY_SUMMARY_MESSAGE = "I'm sorry, but I couldn't generate a proper summary from the data."
+NLG_REQUEST_FAILED_MESSAGE = "Sorry, I encountered an error while summarizing the data."
+NLG_UNEXPECTED_ERROR_MESSAGE = "Sorry, I encountered an error while formulating the response."
+NLG_FALLBACK_MESSAGES = frozenset({NLG_EMPTY_SUMMARY_MESSAGE, NLG_REQUEST_FAILED_MESSAGE, NLG_UNEXPECTED_ERROR_MESSAGE})
 
-# Define the API details from the documentation
-API_URL = "https://api.sarvam.ai/v1/chat/completions"
-MODEL_IDENTIFIER = "sarvam-m"
+# Shared HTTP session, built on first use so importing this module needs no API key
+_http_session: Optional[requests.Session] = None
+_http_session_lock = threading.Lock()
+
+class _AbortableConnectionsMixin:
+    """
+    Ties each connection checked out of the pool to the cancel token of the
+    pipeline using it, so cancelling the pipeline shuts the socket down and
+    the blocked request fails immediately instead of waiting for Sarvam.
+    """
+
+    def _get_conn(self, timeout=None):
+        conn = super()._get_conn(timeout)
+        token = current_cancel_token.get()
+        if token is not None:
+            conn.cancel_registration = token.register(lambda: _abort_connection(conn))
+        return conn
+
+    def _put_conn(self, conn):
+        registration = getattr(conn, "cancel_registration", None)
+        if registration is not None:
+            # Waits for an abort already in progress; afterwards the connection is no longer ours
+            registration.release()
+            conn.cancel_registration = None
+        super()._put_conn(conn)
+
+class _AbortableHTTPConnectionPool(_AbortableConnectionsMixin, HTTPConnectionPool):
+    pass
+
+class _AbortableHTTPSConnectionPool(_AbortableConnectionsMixin, HTTPSConnectionPool):
+    pass
+
+def _abort_connection(conn) -> None:
+    sock = getattr(conn, "sock", None)
+    if sock is None:
+        # Not connected yet (or already closed): there is no request in flight to abort
+        return
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        return
+    cancellation_stats.record_http_abort()
+
+class AbortableHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose pooled connections can be aborted by pipeline cancellation."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _AbortableHTTPConnectionPool,
+            "https": _AbortableHTTPSConnectionPool,
+        }
+
+def get_http_session() -> requests.Session:
+    """
+    Returns the pooled Sarvam AI session, creating it on first use. Reusing it
+    keeps the TCP/TLS connection alive between calls.
+    """
+    global _http_session
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                # The key now comes from settings (which read the .env file) instead of load_dotenv()
+                if not settings.SARVAM_API_KEY:
+                    raise ValueError("API key not found. Please set the SARVAM_API_KEY in your .env file.")
+                session = requests.Session()
+                # Prepare the headers for all API requests
+                session.headers.update({
+                    "Authorization": f"Bearer {settings.SARVAM_API_KEY}",
+                    "Content-Type": "application/json"
+                })
+                pool_size = max(10, settings.BATCH_CONCURRENCY)
+                session.mount("https://", AbortableHTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+                _http_session = session
+    return _http_session
+
+def close_http_session() -> None:
+    global _http_session
+    with _http_session_lock:
+        if _http_session is not None:
+            _http_session.close()
+        _http_session = None
+
+class CircuitBreaker:
+    """
+    Stops calling the LLM after repeated upstream failures, then lets a
+    single trial request through once the reset timeout has passed.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def release(self) -> None:
+        """Frees the trial slot without judging the upstream (the call was abandoned)."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            self._trial_in_flight = False
+            if self.opened_at is not None or self.consecutive_failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+_llm_circuit: Optional[CircuitBreaker] = None
+
+def get_llm_circuit() -> CircuitBreaker:
+    global _llm_circuit
+    if _llm_circuit is None:
+        with _http_session_lock:
+            if _llm_circuit is None:
+                _llm_circuit = CircuitBreaker(
+                    failure_threshold=settings.LLM_CIRCUIT_FAILURE_THRESHOLD,
+                    reset_timeout=settings.LLM_CIRCUIT_RESET_TIMEOUT
+                )
+    return _llm_circuit
+
+def _is_upstream_failure(error: requests.exceptions.RequestException) -> bool:
+    # Client errors (bad payload, auth) say nothing about Sarvam's health
+    response = getattr(error, 'response', None)
+    return response is None or response.status_code >= 500 or response.status_code == 429
+
+def _post_chat_completion(payload: dict) -> dict:
+    """
+    Sends a chat completion request through the circuit breaker and returns the parsed body.
+    """
+    session = get_http_session()
+    if is_cancelled():
+        raise RequestCancelledError("Pipeline was cancelled; skipping request to Sarvam AI")
+    llm_circuit = get_llm_circuit()
+    if not llm_circuit.allow_request():
+        raise LLMServiceError("LLM circuit is open; skipping request to Sarvam AI")
+
+    try:
+        with span("http.sarvam", max_tokens=payload.get("max_tokens")):
+            response = session.post(API_URL, json=payload)
+            response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        if is_cancelled():
+            # We aborted it ourselves; that says nothing about Sarvam's health
+            llm_circuit.release()
+            raise RequestCancelledError("Request to Sarvam AI aborted: pipeline was cancelled") from e
+        if _is_upstream_failure(e):
+            llm_circuit.record_failure()
+        else:
+            llm_circuit.record_success()
+        raise
+    except Exception:
+        llm_circuit.record_failure()
+        raise
 
-# Prepare the headers for all API requests
-headers = {
-    "Authorization": f"Bearer {SARVAM_API_KEY}",
-    "Content-Type": "application/json"
-}
+    llm_circuit.record_success()
+    return response.json()
 
 
 # --- PART 2: CORE LLM FUNCTIONS ---
@@ -51,6 +240,9 @@ def get_json_from_query(user_query):
             - The JSON must have 'fields' (a list of columns) and 'filters' (a dictionary for 'state' and 'district').
             - Extract the state and district names accurately, even if they have multiple words.
             - If the user asks for general 'data', include all relevant numeric columns in the 'fields' list.
+            - For comparisons on numeric columns add 'conditions' to 'filters': a list of {{"field": <column>, "op": one of ">", ">=", "<", "<=", "=", "!=", "value": <number>}}.
+            - For rankings ("top", "most", "least", "highest") add 'order_by' {{"field": <column>, "direction": "desc" or "asc"}} and 'limit' (a number) to 'filters'.
+            - If the user asks how something changed over several years, add 'years' to 'filters' as {{"from": <first year>, "to": <last year>}}. Use {CURRENT_ASSESSMENT_YEAR} when no end year is given. Omit 'years' otherwise.
             - Relevant columns are: {', '.join(column_list)}.
             - Only return a valid JSON object.
             """
@@ -67,6 +259,15 @@ def get_json_from_query(user_query):
 
             Query: "groundwater data for Bengaluru South, Karnataka"
             JSON: {{"fields": ["RainfallTotal", "AnnualGroundwaterRechargeTotal", "AnnualExtractableGroundwaterResourceTotal", "GroundWaterExtractionforAllUsesTotal", "StageofGroundWaterExtractionTotal", "NetAnnualGroundWaterAvailabilityforFutureUseTotal"], "filters": {{"state": "Karnataka", "district": "Bengaluru South"}}}}
+
+            Query: "top 10 most over-exploited districts in Punjab"
+            JSON: {{"fields": ["StageofGroundWaterExtractionTotal"], "filters": {{"state": "Punjab", "order_by": {{"field": "StageofGroundWaterExtractionTotal", "direction": "desc"}}, "limit": 10}}}}
+
+            Query: "districts with extraction stage above 100%"
+            JSON: {{"fields": ["StageofGroundWaterExtractionTotal"], "filters": {{"conditions": [{{"field": "StageofGroundWaterExtractionTotal", "op": ">", "value": 100}}]}}}}
+
+            Query: "How has Chennai's extraction stage changed since 2017?"
+            JSON: {{"fields": ["StageofGroundWaterExtractionTotal"], "filters": {{"district": "Chennai", "years": {{"from": 2017, "to": {CURRENT_ASSESSMENT_YEAR}}}}}}}
             ---
             Now, convert this query: "{user_query}" """
         }
@@ -76,9 +277,7 @@ def get_json_from_query(user_query):
 
     try:
         logger.info(f"Sending request to Sarvam AI API with payload: {payload}")
-        response = requests.post(API_URL, headers=headers, json=payload)
-        response.raise_for_status()
-        api_output = response.json()
+        api_output = _post_chat_completion(payload)
         logger.debug(f"API Response: {api_output}")
         generated_content = api_output['choices'][0]['message']['content'].strip()
         cleaned_json = generated_content.replace('```json', '').replace('```', '').strip()
@@ -173,23 +372,80 @@ def get_english_from_data(user_query, db_data):
     try:
         # Log the request
         logger.info(f"Sending data-to-text request for query: {user_query}")
-        response = requests.post(API_URL, headers=headers, json=payload)
-        response.raise_for_status()
-        api_output = response.json()
+        api_output = _post_chat_completion(payload)
         logger.debug(f"API Response: {api_output}")
         
         if 'choices' in api_output and len(api_output['choices']) > 0:
             return api_output['choices'][0]['message']['content'].strip()
         else:
             logger.error("API response missing 'choices' or empty choices array")
-            return "I'm sorry, but I couldn't generate a proper summary from the data."
+            return NLG_EMPTY_SUMMARY_MESSAGE
             
     except requests.exceptions.RequestException as e:
         logger.error(f"API request failed in get_english_from_data: {e}")
         if hasattr(e, 'response') and e.response is not None:
             logger.error(f"API error response: {e.response.text}")
-        return "Sorry, I encountered an error while summarizing the data."
+        return NLG_REQUEST_FAILED_MESSAGE
         
     except Exception as e:
         logger.error(f"Unexpected error in get_english_from_data: {str(e)}")
-        return "Sorry, I encountered an error while formulating the response."
\ No newline at end of file
+        return NLG_UNEXPECTED_ERROR_MESSAGE
+
+def get_english_from_trend(user_query, trend_data):
+    """
+    NLG for multi-year questions: summarizes per-series trend data whose
+    deltas and growth rates were computed ahead of time.
+    """
+    if not trend_data:
+        return "I couldn't find any multi-year data matching your query."
+
+    data_string = "\n".join([str(series) for series in trend_data])
+
+    messages = [
+        {
+            "role": "system",
+            "content": """You are a detailed data assistant for the INGRES groundwater system.
+            You are given one record per State, District and metric with its yearly 'points'
+            (value, change from the previous year 'delta', and 'growth_rate' in percent) and the
+            overall 'total_change', 'percent_change' and 'cagr_percent' (compound annual growth).
+            - Describe how each metric changed over the period, quoting the first and last values
+            - Use the precomputed changes and growth rates; do not recompute them
+            - Mention notable jumps between consecutive years
+            - Round numerical values to 2 decimal places for readability
+            """
+        },
+        {
+            "role": "user",
+            "content": f"""User Query: "{user_query}"
+            Trend Data:
+            {data_string}
+
+            Your Summary:
+            """
+        }
+    ]
+
+    payload = {
+        "model": MODEL_IDENTIFIER,
+        "messages": messages,
+        "temperature": 0.1,
+        "max_tokens": 1000
+    }
+
+    try:
+        logger.info(f"Sending trend summary request for query: {user_query}")
+        api_output = _post_chat_completion(payload)
+        logger.debug(f"API Response: {api_output}")
+
+        if 'choices' in api_output and len(api_output['choices']) > 0:
+            return api_output['choices'][0]['message']['content'].strip()
+        logger.error("API response missing 'choices' or empty choices array")
+        return NLG_EMPTY_SUMMARY_MESSAGE
+
+    except requests.exceptions.RequestException as e:
+        logger.error(f"API request failed in get_english_from_trend: {e}")
+        return NLG_REQUEST_FAILED_MESSAGE
+
+    except Exception as e:
+        logger.error(f"Unexpected error in get_english_from_trend: {str(e)}")
+        return NLG_UNEXPECTED_ERROR_MESSAGE
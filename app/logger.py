@@ -9,19 +9,28 @@ class INGRESLogger:
     """Custom logger for INGRES Chatbot with structured logging"""
 
     def __init__(self, name: str):
-        self.logger = logging.getLogger(name)
-        self.logger.setLevel(getattr(logging, settings.LOG_LEVEL.upper()))
-
-        if not self.logger.handlers:
-            # Console handler
-            console_handler = logging.StreamHandler(sys.stdout)
-            console_handler.setLevel(getattr(logging, settings.LOG_LEVEL.upper()))
-
-            # Formatter
-            formatter = logging.Formatter(settings.LOG_FORMAT)
-            console_handler.setFormatter(formatter)
-
-            self.logger.addHandler(console_handler)
+        self.name = name
+        self._logger: Optional[logging.Logger] = None
+
+    @property
+    def logger(self) -> logging.Logger:
+        """Configure the underlying logger on first use so importing modules stays cheap"""
+        if self._logger is None:
+            logger = logging.getLogger(self.name)
+            logger.setLevel(getattr(logging, settings.LOG_LEVEL.upper()))
+
+            if not logger.handlers:
+                # Console handler
+                console_handler = logging.StreamHandler(sys.stdout)
+                console_handler.setLevel(getattr(logging, settings.LOG_LEVEL.upper()))
+
+                # Formatter
+                formatter = logging.Formatter(settings.LOG_FORMAT)
+                console_handler.setFormatter(formatter)
+
+                logger.addHandler(console_handler)
+            self._logger = logger
+        return self._logger
 
     def log_api_request(self, session_id: str, query: str, language: str = "en") -> None:
         """Log API request details"""
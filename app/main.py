@@ -1,13 +1,19 @@
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware  # <-- IMPORT THIS
 from .config import settings
-from .api import endpoints
+from .api import endpoints, websocket
+from .api.schemas import HealthResponse
+from .health import readiness_report
+from .middleware import InFlightRequestsMiddleware, TracingMiddleware
+from .lifecycle import lifespan
 
 # Create the FastAPI app instance
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
-    description="AI-driven ChatBOT for INGRES as a virtual assistant"
+    description="AI-driven ChatBOT for INGRES as a virtual assistant",
+    lifespan=lifespan
 )
 
 # --- ADD THIS MIDDLEWARE BLOCK ---
@@ -27,10 +33,13 @@ app.add_middleware(
     allow_methods=["*"],    # Allow all methods (GET, POST, etc.)
     allow_headers=["*"],    # Allow all headers
 )
+app.add_middleware(TracingMiddleware)
+app.add_middleware(InFlightRequestsMiddleware)
 # --- END OF MIDDLEWARE BLOCK ---
 
 # Include the router from the endpoints module
 app.include_router(endpoints.router, prefix="/api/v1")
+app.include_router(websocket.router, prefix="/api/v1")
 
 @app.get("/", tags=["Root"])
 def read_root():
@@ -40,8 +49,24 @@ def read_root():
     return {"message": f"Welcome to the {settings.APP_NAME}!"}
 
 @app.get("/health", tags=["Health Check"])
+@app.get("/health/live", tags=["Health Check"])
 def health_check():
     """
-    A simple health check endpoint to confirm the API is running.
+    Liveness probe: confirms the process is up and serving requests.
     """
-    return {"status": "ok", "version": settings.APP_VERSION}
\ No newline at end of file
+    return {"status": "ok", "version": settings.APP_VERSION}
+
+@app.get("/health/ready", tags=["Health Check"], response_model=HealthResponse)
+async def readiness_check():
+    """
+    Readiness probe: reports dependency health and returns 503 when the
+    database or LLM is unavailable, so traffic is routed elsewhere.
+    """
+    ready, services, details = await readiness_report()
+    body = HealthResponse(
+        status="ready" if ready else "unavailable",
+        version=settings.APP_VERSION,
+        services=services,
+        details=details
+    )
+    return JSONResponse(status_code=200 if ready else 503, content=body.model_dump(mode="json"))
\ No newline at end of file
@@ -1,12 +1,23 @@
 from fastapi import Request, HTTPException, status
 from fastapi.responses import JSONResponse
+import asyncio
+import hmac
+import os
+import random
 import time
 from typing import Dict, Any, Callable
 from .config import settings
 from .logger import get_logger
 from .exceptions import rate_limit_exception
+from .tracing import span, start_trace, end_trace
 from datetime import datetime
 
+try:
+    # Optional: statistical profiler used for admin-requested profiles
+    from pyinstrument import Profiler
+except ImportError:
+    Profiler = None
+
 logger = get_logger(__name__)
 
 class RateLimitMiddleware:
@@ -63,7 +74,7 @@ async def rate_limit_middleware(request: Request, call_next: Callable) -> JSONRe
     client_ip = request.client.host if request.client else "unknown"
 
     # Skip rate limiting for certain paths
-    if request.url.path == "/health" or request.url.path == "/":
+    if request.url.path.startswith("/health") or request.url.path == "/":
         return await call_next(request)
 
     if rate_limiter.is_rate_limited(client_ip):
@@ -118,4 +129,95 @@ async def error_handling_middleware(request: Request, call_next: Callable) -> JS
                 "success": False,
                 "timestamp": datetime.now().isoformat(),
             }
-        )
\ No newline at end of file
+        )
+
+class InFlightRequestsMiddleware:
+    """
+    ASGI middleware counting requests that are still being served. It wraps
+    the whole ASGI call, so streaming responses count until their last chunk.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            return await self.app(scope, receive, send)
+
+        in_flight_requests["total"] += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            in_flight_requests["total"] -= 1
+
+# Current number of in-flight requests, read by the readiness probe
+in_flight_requests: Dict[str, int] = {"total": 0}
+
+
+def _is_admin(headers: Dict[str, str]) -> bool:
+    token = settings.ADMIN_API_TOKEN
+    supplied = headers.get("x-admin-token")
+    if not token or supplied is None:
+        return False
+    # Header values are decoded as latin-1; compare bytes so non-ASCII input is a mismatch, not a TypeError
+    return hmac.compare_digest(supplied.encode("latin-1"), token.encode("utf-8"))
+
+class TracingMiddleware:
+    """
+    ASGI middleware that traces a request when an admin asks for it with
+    `X-Trace: 1` or when it is picked by TRACE_SAMPLE_RATE, and attaches a
+    statistical profiler for admin requests sending `X-Profile: 1`.
+    Untraced requests only pay for the header check.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]}
+        is_admin = (headers.get("x-trace") == "1" or headers.get("x-profile") == "1") and _is_admin(headers)
+        want_trace = (is_admin and headers.get("x-trace") == "1") or (
+            settings.TRACE_SAMPLE_RATE > 0 and random.random() < settings.TRACE_SAMPLE_RATE
+        )
+        want_profile = is_admin and headers.get("x-profile") == "1"
+        if not want_trace and not want_profile:
+            return await self.app(scope, receive, send)
+
+        trace, token = start_trace(f"{scope['method']} {scope['path']}")
+        profiler = None
+        if want_profile:
+            if Profiler is None:
+                logger.warning("Profiling requested but pyinstrument is not installed")
+            else:
+                profiler = Profiler(async_mode="enabled")
+                profiler.start()
+
+        async def send_with_trace_id(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-trace-id", trace.trace_id.encode())]
+            await send(message)
+
+        try:
+            with span("http.request", method=scope["method"], path=scope["path"]):
+                await self.app(scope, receive, send_with_trace_id)
+        finally:
+            end_trace(token)
+            if profiler is not None:
+                profiler.stop()
+            await asyncio.to_thread(self._export, trace, profiler)
+
+    def _export(self, trace, profiler) -> None:
+        try:
+            path = trace.dump(settings.TRACE_OUTPUT_DIR)
+            logger.info(f"TRACE | {trace.name} | Spans: {len(trace.events)} | File: {path}")
+            if profiler is not None:
+                profile_path = os.path.join(settings.TRACE_OUTPUT_DIR, f"{trace.trace_id}.profile.html")
+                with open(profile_path, "w", encoding="utf-8") as f:
+                    f.write(profiler.output_html())
+                logger.info(f"PROFILE | {trace.name} | File: {profile_path}")
+        except Exception as e:
+            logger.error(f"Failed to export trace {trace.trace_id}: {e}")
@@ -0,0 +1,144 @@
+# app/prefetch.py
+# Speculative DB prefetch: guess the location filters from the raw query with
+# the gazetteer and start reading rows while the LLM is still parsing it.
+import asyncio
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from .db import execute_query, has_ranking_filters, rows_matching_filters
+from .gazetteer import loaded_gazetteer
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+def _normalize(name: str) -> str:
+    return " " + " ".join(_NON_WORD.sub(" ", str(name).lower()).split()) + " "
+
+class PrefetchStats:
+    """Counters for speculative reads: how often they were used and what was thrown away."""
+
+    def __init__(self):
+        self.attempts = 0
+        self.hits = 0
+        self.misses = 0
+        self.wasted_rows = 0
+        self.wasted_seconds = 0.0
+        self.saved_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, hit: bool, rows: int, seconds: float) -> None:
+        with self._lock:
+            self.attempts += 1
+            if hit:
+                self.hits += 1
+                self.saved_seconds += seconds
+            else:
+                self.misses += 1
+                self.wasted_rows += rows
+                self.wasted_seconds += seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "attempts": self.attempts,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / self.attempts, 3) if self.attempts else None,
+            "wasted_rows": self.wasted_rows,
+            "wasted_db_seconds": round(self.wasted_seconds, 3),
+            "saved_db_seconds": round(self.saved_seconds, 3),
+        }
+
+prefetch_stats = PrefetchStats()
+
+def guess_filters(query: str) -> Optional[Dict[str, str]]:
+    """
+    Cheap local stand-in for the NLU step: whole-word matches of known
+    district and state names. Returns the narrowest unambiguous location
+    filter, or None when the query names no location (or too many), or
+    while the gazetteer is not loaded yet: guessing must never wait on the
+    database, or it would delay the NLU call it is meant to overlap.
+    """
+    gazetteer = loaded_gazetteer()
+    if gazetteer is None:
+        return None
+
+    text = _normalize(query)
+    districts = {loc["district"] for loc in gazetteer["districts"] if _normalize(loc["district"]) in text}
+    if len(districts) == 1:
+        return {"district": districts.pop()}
+    states = [state for state in gazetteer["states"] if _normalize(state) in text]
+    if len(states) == 1 and not districts:
+        return {"state": states[0]}
+    return None
+
+def covers(guess: Dict[str, str], filters: dict) -> bool:
+    """
+    True when every row the NLU filters select is also in the guessed read.
+    Matching is ILIKE '%value%', so that holds whenever each guessed value is
+    a substring of the corresponding NLU value. Ranking, range and trend
+    questions read differently and are never covered.
+    """
+    if has_ranking_filters(filters) or filters.get('years'):
+        return False
+    return all(
+        key in filters and str(value).lower() in str(filters[key]).lower()
+        for key, value in guess.items()
+    )
+
+class Prefetch:
+    """
+    One speculative read, started before the NLU result is known. Exactly
+    one of take() or discard() settles it and updates prefetch_stats.
+    """
+
+    def __init__(self, guess: Dict[str, str]):
+        self.guess = guess
+        self.seconds = 0.0
+        self.settled = False
+        self.task: asyncio.Task = asyncio.create_task(asyncio.to_thread(self._read))
+
+    def _read(self) -> List[dict]:
+        start_time = time.perf_counter()
+        try:
+            return execute_query(self.guess)
+        finally:
+            self.seconds = time.perf_counter() - start_time
+
+    async def take(self, filters: dict) -> Optional[List[dict]]:
+        """
+        Returns the prefetched rows narrowed to the real filters, or None
+        (discarding the read) when the guess does not cover them.
+        """
+        if self.settled or not covers(self.guess, filters):
+            logger.info(f"Prefetch miss: guessed {self.guess}, NLU returned {filters}")
+            self.discard()
+            return None
+        self.settled = True
+        try:
+            rows = await self.task
+        except Exception as e:
+            logger.warning(f"Prefetch read failed: {e}")
+            prefetch_stats.record(False, 0, self.seconds)
+            return None
+        prefetch_stats.record(True, len(rows), self.seconds)
+        return rows_matching_filters(rows, filters)
+
+    def discard(self) -> None:
+        """Drops the read; its cost is counted as wasted once it finishes."""
+        if self.settled:
+            return
+        self.settled = True
+
+        def record(task: asyncio.Task) -> None:
+            rows = task.result() if not task.cancelled() and task.exception() is None else []
+            prefetch_stats.record(False, len(rows), self.seconds)
+
+        self.task.add_done_callback(record)
+
+async def speculate(query: str) -> Optional[Prefetch]:
+    """Starts a speculative read for the query, if its location can be guessed."""
+    guess = guess_filters(query)
+    return Prefetch(guess) if guess else None
@@ -0,0 +1,199 @@
+# app/replicas.py
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection, Engine, make_url
+from sqlalchemy.exc import InterfaceError, OperationalError
+from .config import settings
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# Errors that mean the node (not the query) is at fault, so another node may succeed
+NODE_ERRORS = (OperationalError, InterfaceError)
+
+def postgres_connect_args(url: str) -> dict:
+    """Fail fast: an unreachable Postgres server costs seconds, not an OS TCP timeout."""
+    if make_url(url).get_backend_name() == "postgresql":
+        return {"connect_timeout": settings.DATABASE_CONNECT_TIMEOUT}
+    return {}
+
+class NoReadNodeAvailable(Exception):
+    """Every read node is down or failed the current read."""
+
+class ReadNode:
+    """
+    One database that can serve reads, with its health and an exponentially
+    weighted moving average of its probe round-trip time.
+    """
+
+    def __init__(self, url: str, engine_factory: Optional[Callable[[], Engine]] = None):
+        parsed = make_url(url)
+        self.url = url
+        self.name = f"{parsed.host}:{parsed.port or 5432}/{parsed.database}"
+        self.healthy: Optional[bool] = None
+        self.latency_ms: Optional[float] = None
+        self.failures = 0
+        self.error: Optional[str] = None
+        self.down_since: Optional[float] = None
+        self.reads = 0
+        self._engine_factory = engine_factory
+        self._engine: Optional[Engine] = None
+        self._lock = threading.Lock()
+
+    @property
+    def engine(self) -> Engine:
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    self._engine = self._engine_factory() if self._engine_factory else self._create_engine()
+        return self._engine
+
+    def _create_engine(self) -> Engine:
+        return create_engine(
+            self.url,
+            pool_size=settings.DATABASE_POOL_SIZE,
+            max_overflow=settings.DATABASE_MAX_OVERFLOW,
+            pool_pre_ping=True,
+            connect_args=postgres_connect_args(self.url)
+        )
+
+    def mark_up(self, latency_ms: Optional[float] = None) -> None:
+        if self.healthy is False:
+            logger.info(f"Read node {self.name} is back up")
+        self.healthy = True
+        self.failures = 0
+        self.error = None
+        self.down_since = None
+        if latency_ms is not None:
+            alpha = settings.DATABASE_LATENCY_EWMA_ALPHA
+            self.latency_ms = latency_ms if self.latency_ms is None else alpha * latency_ms + (1 - alpha) * self.latency_ms
+
+    def mark_down(self, error: Exception) -> None:
+        if self.healthy is not False:
+            logger.warning(f"Read node {self.name} marked down: {error}")
+            self.down_since = time.monotonic()
+        self.healthy = False
+        self.failures += 1
+        self.error = str(error) or type(error).__name__
+
+    def retry_due(self) -> bool:
+        return self.down_since is not None and time.monotonic() - self.down_since >= settings.DATABASE_NODE_RETRY_INTERVAL
+
+    def probe(self) -> float:
+        start_time = time.perf_counter()
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        return (time.perf_counter() - start_time) * 1000
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "healthy": self.healthy,
+            "latency_ms": round(self.latency_ms, 2) if self.latency_ms is not None else None,
+            "failures": self.failures,
+            "reads": self.reads,
+            "error": self.error,
+        }
+
+    def dispose(self) -> None:
+        # The primary's engine is owned by app.db
+        if self._engine is not None and self._engine_factory is None:
+            self._engine.dispose()
+        self._engine = None
+
+class ReadRouter:
+    """
+    Sends each read to the fastest healthy node and fails over to the next
+    one on connection errors. Down nodes are skipped while another node is
+    up, until a probe (or the retry interval) brings them back.
+    """
+
+    def __init__(self, nodes: List[ReadNode]):
+        self.nodes = nodes
+        self.failovers = 0
+
+    def candidates(self) -> List[ReadNode]:
+        """
+        Healthy (or not yet probed) nodes by latency, then down nodes due a
+        retry. With no node left up, every down node is tried as a last resort
+        (longest down first), so a single database is never locked out.
+        """
+        up = [node for node in self.nodes if node.healthy is not False]
+        up.sort(key=lambda node: node.latency_ms if node.latency_ms is not None else float("inf"))
+        down = sorted((node for node in self.nodes if node.healthy is False), key=lambda node: node.down_since or 0.0)
+        if not up:
+            return down
+        return up + [node for node in down if node.retry_due()]
+
+    def _connect(self, node: ReadNode) -> Optional[Connection]:
+        try:
+            return node.engine.connect()
+        except NODE_ERRORS as e:
+            node.mark_down(e)
+            self.failovers += 1
+            return None
+
+    @contextmanager
+    def connection(self) -> Iterator[Connection]:
+        """A connection to the best node that accepts one; for streaming reads."""
+        for node in self.candidates():
+            conn = self._connect(node)
+            if conn is None:
+                continue
+            node.reads += 1
+            if node.healthy is False:
+                node.mark_up()
+            with conn:
+                yield conn
+            return
+        raise NoReadNodeAvailable("No database node accepted the connection")
+
+    def run(self, read: Callable[[Connection], T]) -> T:
+        """Runs read(conn) on the best node, retrying on the next node if this one fails."""
+        for node in self.candidates():
+            conn = self._connect(node)
+            if conn is None:
+                continue
+            try:
+                with conn:
+                    result = read(conn)
+            except NODE_ERRORS as e:
+                # Only a lost connection is the node's fault; a failed statement would fail anywhere
+                if not e.connection_invalidated:
+                    raise
+                node.mark_down(e)
+                self.failovers += 1
+                continue
+            node.reads += 1
+            if node.healthy is False:
+                node.mark_up()
+            return result
+        raise NoReadNodeAvailable("All database nodes failed the read")
+
+    async def probe_all(self) -> None:
+        async def probe(node: ReadNode) -> None:
+            try:
+                latency_ms = await asyncio.wait_for(asyncio.to_thread(node.probe), timeout=settings.DATABASE_PROBE_TIMEOUT)
+                node.mark_up(latency_ms)
+            except Exception as e:
+                node.mark_down(e if not isinstance(e, asyncio.TimeoutError) else TimeoutError("probe timed out"))
+
+        await asyncio.gather(*(probe(node) for node in self.nodes))
+
+    async def probe_forever(self) -> None:
+        """Background task: refresh node health and latency every DATABASE_PROBE_INTERVAL seconds."""
+        while True:
+            await self.probe_all()
+            await asyncio.sleep(settings.DATABASE_PROBE_INTERVAL)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"failovers": self.failovers, "nodes": {node.name: node.stats() for node in self.nodes}}
+
+    def dispose(self) -> None:
+        for node in self.nodes:
+            node.dispose()
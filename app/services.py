@@ -1,54 +1,275 @@
 # app/services.py
 import asyncio
 import json
-from .api.schemas import ChatRequest
-from .llm_utils import get_json_from_query, get_english_from_data
-from .db import execute_query
+from .api.schemas import ChatRequest, BatchChatRequest
+from .config import settings
+from .cache import cache_key, get_cache
+from .cancellation import cancellation_scope, enter_stage
+from .llm_utils import get_json_from_query, get_english_from_data, get_english_from_trend, NLG_FALLBACK_MESSAGES
+from .intent import DATA, classify_intent, canned_response
+from .db import execute_query, execute_batch_query, rows_matching_filters, has_ranking_filters
 from .logger import get_logger
+from .prefetch import speculate
+from .sse import ChatStream, SSEEncoder, dumps, stream_registry
+from .timeseries import get_year_range, execute_trend_query, summarize_trends
+from .tracing import span
 
 logger = get_logger(__name__)
 
+def cached_json_from_query(user_query: str):
+    """get_json_from_query behind the shared cache (failed parses are not cached)."""
+    key = cache_key("nlu", " ".join(user_query.lower().split()))
+    return get_cache().get_or_set(key, lambda: get_json_from_query(user_query), ttl=settings.CACHE_NLU_TTL)
+
+def cached_answer(generate, user_query: str, data: list) -> str:
+    """Runs an NLG function behind the shared cache, keyed on the question and the exact data."""
+    key = cache_key("answer", generate.__name__, " ".join(user_query.lower().split()), data)
+    produced = {}
+
+    def produce():
+        produced["text"] = generate(user_query, data)
+        # Fallback apologies mean the LLM call failed; let the next request retry
+        return None if produced["text"] in NLG_FALLBACK_MESSAGES else produced["text"]
+
+    text = get_cache().get_or_set(key, produce, ttl=settings.CACHE_ANSWER_TTL)
+    return text if text is not None else produced["text"]
+
+def filters_from(query_json) -> dict:
+    """The 'filters' object of an NLU result; {} for anything malformed (e.g. "filters": null)."""
+    filters = query_json.get('filters') if isinstance(query_json, dict) else None
+    return filters if isinstance(filters, dict) else {}
+
 class ChatService:
-    async def generate_streaming_response(self, request: ChatRequest):
+    async def stream_events(self, request: ChatRequest):
         """
-        Main entry point for generating responses as an asynchronous stream.
+        Runs the chat pipeline and yields its events as dicts: 'status'
+        updates, the final 'answer', an optional 'graph' visualization and
+        'error'. Transports (SSE, WebSocket) decide how to frame them.
+        Blocking LLM/DB calls run in worker threads so concurrent
+        conversations do not stall the event loop.
         """
         logger.info(f"Processing query: {request.query}")
         
-        try:
-            # Send status updates that won't be included in final response
-            yield "data: {\"type\": \"status\", \"message\": \"Analyzing your query with AI intelligence...\"}\n\n"
-            await asyncio.sleep(0.3)
+        with span("chat.pipeline", session_id=request.session_id):
+            # Greetings, help and out-of-scope questions never reach the LLM or the database
+            with span("chat.intent"):
+                intent = classify_intent(request.query)
+            if intent.intent != DATA:
+                logger.info(f"Answered locally as '{intent.intent}' intent")
+                yield {
+                    "type": "answer",
+                    "text": canned_response(intent),
+                    "intent": intent.intent,
+                    "suggested_queries": intent.suggested_queries
+                }
+                return
+
+            prefetch = None
+            try:
+                # Start reading the likely rows while the LLM parses the query
+                if settings.SPECULATIVE_PREFETCH:
+                    prefetch = await speculate(request.query)
 
-            # --- Step 2: Convert natural language to structured query ---
-            query_json = get_json_from_query(request.query)
-            logger.info(f"Generated query JSON: {query_json}")
+                # Send status updates that won't be included in final response
+                yield {"type": "status", "message": "Analyzing your query with AI intelligence..."}
+                await asyncio.sleep(0.3)
+
+                # --- Step 2: Convert natural language to structured query ---
+                enter_stage("nlu")
+                with span("chat.nlu"):
+                    query_json = await asyncio.to_thread(cached_json_from_query, request.query)
+                logger.info(f"Generated query JSON: {query_json}")
             
-            yield "data: {\"type\": \"status\", \"message\": \"Fetching groundwater data from database...\"}\n\n"
-            await asyncio.sleep(0.2)
+                yield {"type": "status", "message": "Fetching groundwater data from database..."}
+                await asyncio.sleep(0.2)
             
-            # Step 2: Execute database query with filters
-            filters = query_json.get('filters', {}) if query_json else {}
-            db_results = execute_query(filters)
-            logger.info(f"Database returned {len(db_results)} results")
+                # Step 2: Execute database query with filters
+                filters = filters_from(query_json)
+                year_range = get_year_range(filters)
+                enter_stage("db")
+                with span("chat.db", filters=filters):
+                    if year_range:
+                        # Multi-year question: one range read over the series store
+                        fields = query_json.get('fields') if isinstance(query_json, dict) else None
+                        series = await asyncio.to_thread(execute_trend_query, filters, year_range, fields)
+                        db_results = summarize_trends(series)
+                    else:
+                        db_results = await prefetch.take(filters) if prefetch else None
+                        if db_results is None:
+                            db_results = await asyncio.to_thread(execute_query, filters)
+                logger.info(f"Database returned {len(db_results)} results")
             
-            yield "data: {\"type\": \"status\", \"message\": \"Preparing comprehensive response...\"}\n\n"
-            await asyncio.sleep(0.2)
+                yield {"type": "status", "message": "Preparing comprehensive response..."}
+                await asyncio.sleep(0.2)
             
-            # Step 3: Generate natural language response
-            response_text = get_english_from_data(request.query, db_results)
+                # Step 3: Generate natural language response
+                enter_stage("nlg")
+                with span("chat.nlg", rows=len(db_results)):
+                    if year_range:
+                        response_text = await asyncio.to_thread(cached_answer, get_english_from_trend, request.query, db_results)
+                    else:
+                        response_text = await asyncio.to_thread(cached_answer, get_english_from_data, request.query, db_results)
             
-            # Send the complete response at once (clean, without processing messages)
-            yield response_text
-
-        except Exception as e:
-            logger.error(f"Error processing query: {str(e)}")
-            error_payload = {
-                "type": "error",
-                "text": "I'm sorry, an error occurred while processing your request.",
-                "errorDetails": str(e)
-            }
-            yield f"data: {json.dumps(error_payload)}\n\n"
+                # Send the complete response at once (clean, without processing messages)
+                yield {"type": "answer", "text": response_text}
+
+                if request.include_visualization and not year_range:
+                    visualization = self._prepare_visualization(db_results, request.query)
+                    if visualization:
+                        yield visualization
+
+            except Exception as e:
+                logger.error(f"Error processing query: {str(e)}")
+                yield {
+                    "type": "error",
+                    "text": "I'm sorry, an error occurred while processing your request.",
+                    "errorDetails": str(e)
+                }
+            finally:
+                if prefetch:
+                    prefetch.discard()
+
+    def start_stream(self, request: ChatRequest) -> ChatStream:
+        """
+        Starts the pipeline in the background, recording its events in a
+        replayable stream that SSE connections read from (and resume).
+        Cancels the session's previous pipeline if it is still running.
+        """
+        stream = stream_registry.create(request.session_id)
+        stream.task = asyncio.create_task(self._run_stream(stream, request))
+        return stream
+
+    async def _run_stream(self, stream: ChatStream, request: ChatRequest) -> None:
+        try:
+            # Cancelling stream.task (e.g. every client left) aborts in-flight LLM and DB calls
+            with cancellation_scope():
+                async for event in self.stream_events(request):
+                    await stream.append(event)
+            await stream.append({"type": "done"})
+        except asyncio.CancelledError:
+            await stream.append({"type": "cancelled"})
+            raise
+        finally:
+            await stream.finish()
+
+    async def generate_batch_stream(self, request: BatchChatRequest):
+        """
+        Answers many queries at once: NLU runs concurrently under a shared
+        limit, the DB is hit once for the whole batch, and NLG is shared by
+        items that ask the same question of the same data. Results are
+        streamed back per item as soon as they are ready.
+        """
+        logger.info(f"Processing batch of {len(request.queries)} queries for session {request.session_id}")
+        semaphore = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+
+        async def limited(func, *args):
+            async with semaphore:
+                return await asyncio.to_thread(func, *args)
+
+        # --- Step 0: answer non-data intents locally ---
+        intents = {query: classify_intent(query) for query in dict.fromkeys(request.queries)}
+        completed = 0
+        for index, query in enumerate(request.queries):
+            if intents[query].intent != DATA:
+                completed += 1
+                yield self._format_batch_item(
+                    {"type": "result", "index": index, "query": query, "success": True,
+                     "intent": intents[query].intent, "response_text": canned_response(intents[query])},
+                    request.format
+                )
+
+        # --- Step 1: NLU, once per distinct query text ---
+        distinct_queries = [query for query, intent in intents.items() if intent.intent == DATA]
+        nlu_results = await asyncio.gather(
+            *(limited(cached_json_from_query, query) for query in distinct_queries),
+            return_exceptions=True
+        )
+        filters_by_query = {}
+        fields_by_query = {}
+        for query, query_json in zip(distinct_queries, nlu_results):
+            if isinstance(query_json, Exception):
+                logger.error(f"Batch NLU failed for '{query}': {query_json}")
+                query_json = None
+            filters_by_query[query] = filters_from(query_json)
+            fields_by_query[query] = query_json.get('fields') if isinstance(query_json, dict) else None
+
+        # --- Step 2: one merged DB query, split back per item ---
+        # Multi-year questions read the series store; ranking/range questions
+        # (ORDER BY, LIMIT, comparisons) run on their own. Neither can share it.
+        year_ranges = {query: get_year_range(filters) for query, filters in filters_by_query.items()}
+        trend_queries = [query for query, year_range in year_ranges.items() if year_range]
+        ranked_queries = [
+            query for query, filters in filters_by_query.items()
+            if not year_ranges[query] and has_ranking_filters(filters)
+        ]
+        mergeable = [
+            filters for query, filters in filters_by_query.items()
+            if not year_ranges[query] and not has_ranking_filters(filters)
+        ]
+        all_rows = await asyncio.to_thread(execute_batch_query, mergeable) if mergeable else []
+        logger.info(f"Batch database query returned {len(all_rows)} rows")
+        ranked_rows = dict(zip(ranked_queries, await asyncio.gather(
+            *(limited(execute_query, filters_by_query[query]) for query in ranked_queries)
+        )))
+        trend_series = await asyncio.gather(*(
+            limited(execute_trend_query, filters_by_query[query], year_ranges[query], fields_by_query[query])
+            for query in trend_queries
+        ))
+        trend_rows = {query: summarize_trends(series) for query, series in zip(trend_queries, trend_series)}
+
+        # --- Step 3: NLG, grouped by (query, matching rows) ---
+        groups = {}
+        for index, query in enumerate(request.queries):
+            if query not in filters_by_query:
+                continue
+            generate = get_english_from_data
+            if query in trend_rows:
+                rows, generate = trend_rows[query], get_english_from_trend
+            elif query in ranked_rows:
+                rows = ranked_rows[query]
+            else:
+                rows = rows_matching_filters(all_rows, filters_by_query[query])
+            key = (query, json.dumps(rows, sort_keys=True, default=str))
+            group = groups.setdefault(key, {"query": query, "rows": rows, "generate": generate, "indexes": []})
+            group["indexes"].append(index)
+
+        async def answer(group):
+            try:
+                text = await limited(cached_answer, group["generate"], group["query"], group["rows"])
+                return group, text, None
+            except Exception as e:
+                return group, None, e
+
+        tasks = [asyncio.create_task(answer(group)) for group in groups.values()]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                group, text, error = await next_done
+                for index in group["indexes"]:
+                    item = {
+                        "type": "result",
+                        "index": index,
+                        "query": group["query"],
+                        "success": error is None,
+                        "response_text": text if error is None else "I'm sorry, an error occurred while processing your request.",
+                    }
+                    if error is not None:
+                        item["errorDetails"] = str(error)
+                    completed += 1
+                    yield self._format_batch_item(item, request.format)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        yield self._format_batch_item(
+            {"type": "done", "count": completed, "llm_nlg_calls": len(groups), "llm_nlu_calls": len(distinct_queries)},
+            request.format
+        )
+
+    def _format_batch_item(self, item: dict, fmt: str) -> bytes:
+        """Frame a batch result as an NDJSON line or an SSE event."""
+        if fmt == "sse":
+            return SSEEncoder.encode(item)
+        return dumps(item) + b"\n"
 
     def _prepare_visualization(self, data, query):
         """Create chart data based on real database results."""
@@ -76,7 +297,7 @@ class ChatService:
         
         # Check for different types of groundwater data
         if 'AnnualGroundwaterRechargeTotal' in sample_data[0]:
-            values = [float(item.get('AnnualGroundwaterRechargeTotal', 0)) for item in sample_data]
+            values = [float(item.get('AnnualGroundwaterRechargeTotal') or 0) for item in sample_data]
             chart_title = "Annual Groundwater Recharge (HAM)"
             chart_data = {
                 "labels": labels,
@@ -89,7 +310,7 @@ class ChatService:
                 }]
             }
         elif 'RainfallTotal' in sample_data[0]:
-            values = [float(item.get('RainfallTotal', 0)) for item in sample_data]
+            values = [float(item.get('RainfallTotal') or 0) for item in sample_data]
             chart_title = "Total Rainfall (mm)"
             chart_data = {
                 "labels": labels,
@@ -102,7 +323,7 @@ class ChatService:
                 }]
             }
         elif 'GroundWaterExtractionforAllUsesTotal' in sample_data[0]:
-            values = [float(item.get('GroundWaterExtractionforAllUsesTotal', 0)) for item in sample_data]
+            values = [float(item.get('GroundWaterExtractionforAllUsesTotal') or 0) for item in sample_data]
             chart_title = "Total Groundwater Extraction (HAM)"
             chart_data = {
                 "labels": labels,
@@ -3,7 +3,7 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from app.db import engine
+from app.db import engine, ensure_ranking_indexes
 from sqlalchemy import text
 
 # Create sample groundwater table
@@ -44,4 +44,9 @@ try:
         conn.commit()
         print("Sample data created successfully!")
 except Exception as e:
-    print(f"Error setting up sample data: {str(e)}")
\ No newline at end of file
+    print(f"Error setting up sample data: {str(e)}")
+try:
+    ensure_ranking_indexes()
+    print("Ranking indexes created successfully!")
+except Exception as e:
+    print(f"Error creating ranking indexes: {str(e)}")
@@ -0,0 +1,52 @@
+# app/snapshot.py
+# Local JSON copy of the "ingressdata2025" table, served when no database
+# node is reachable (DATABASE_SNAPSHOT_FALLBACK). Refresh it with:
+# python -m app.snapshot
+import json
+import os
+import threading
+from decimal import Decimal
+from typing import List, Optional, Tuple
+from .config import settings
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+# (mtime, rows) of the last file read, so the snapshot is parsed once per change
+_snapshot: Optional[Tuple[float, List[dict]]] = None
+_snapshot_lock = threading.Lock()
+
+def load_snapshot() -> List[dict]:
+    """
+    Returns the snapshot rows, re-reading the file only when it has changed.
+    Raises FileNotFoundError when no snapshot has been written.
+    """
+    global _snapshot
+    path = settings.DATABASE_SNAPSHOT_PATH
+    mtime = os.path.getmtime(path)
+    with _snapshot_lock:
+        if _snapshot is None or _snapshot[0] != mtime:
+            with open(path, "r", encoding="utf-8") as f:
+                _snapshot = (mtime, json.load(f))
+            logger.info(f"Loaded database snapshot with {len(_snapshot[1])} rows from {path}")
+        return _snapshot[1]
+
+def _json_default(value):
+    # NUMERIC columns come back as Decimal; keep them comparable as numbers
+    return float(value) if isinstance(value, Decimal) else str(value)
+
+def write_snapshot(rows: List[dict], path: Optional[str] = None) -> None:
+    """Atomically replaces the snapshot file with the given rows."""
+    path = path or settings.DATABASE_SNAPSHOT_PATH
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(rows, f, default=_json_default)
+    os.replace(tmp_path, path)
+    logger.info(f"Wrote database snapshot with {len(rows)} rows to {path}")
+
+if __name__ == "__main__":
+    from .db import stream_query
+    write_snapshot([row for batch in stream_query({}) for row in batch])
@@ -0,0 +1,216 @@
+# app/sse.py
+import asyncio
+import json
+import time
+import uuid
+import zlib
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from .config import settings
+from .logger import get_logger
+
+try:
+    # Optional: much faster JSON serialization when installed
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = get_logger(__name__)
+
+def dumps(event: dict) -> bytes:
+    """Serialize an event payload to compact JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(event, default=str)
+    return json.dumps(event, default=str, separators=(",", ":")).encode("utf-8")
+
+class SSEEncoder:
+    """Frames events in the text/event-stream wire format."""
+
+    HEARTBEAT = b": heartbeat\n\n"
+
+    @staticmethod
+    def encode(event: dict, event_id: Optional[str] = None, retry_ms: Optional[int] = None) -> bytes:
+        parts = []
+        if event_id is not None:
+            parts.append(b"id: " + event_id.encode("utf-8") + b"\n")
+        if retry_ms is not None:
+            parts.append(b"retry: " + str(retry_ms).encode("ascii") + b"\n")
+        # JSON never contains raw newlines, so a single data line is always enough
+        parts.append(b"data: " + dumps(event) + b"\n\n")
+        return b"".join(parts)
+
+class GzipEventStream:
+    """
+    Gzip-compresses an event stream while flushing after every event, so the
+    client can decode each event as soon as it arrives.
+    """
+
+    def __init__(self, level: int = 6):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+class ChatStream:
+    """
+    Replay buffer for one response stream. The pipeline appends encoded
+    events; any number of connections can read them from a given position,
+    so a client that reconnects with Last-Event-ID picks up where it left off.
+    """
+
+    def __init__(self, stream_id: str, session_id: Optional[str] = None):
+        self.stream_id = stream_id
+        self.session_id = session_id
+        self.events: List[Tuple[int, bytes]] = []
+        self.next_seq = 0
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        self.subscribers = 0
+        self._abandon_timer: Optional[asyncio.TimerHandle] = None
+        self._changed = asyncio.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.finished_at is not None
+
+    def event_id(self, seq: int) -> str:
+        return f"{self.stream_id}:{seq}"
+
+    async def append(self, event: dict) -> None:
+        async with self._changed:
+            seq = self.next_seq
+            self.next_seq += 1
+            retry_ms = settings.SSE_RETRY_MS if seq == 0 else None
+            self.events.append((seq, SSEEncoder.encode(event, self.event_id(seq), retry_ms)))
+            # Bound memory: events older than the window can no longer be replayed
+            overflow = len(self.events) - settings.SSE_REPLAY_MAX_EVENTS
+            if overflow > 0:
+                del self.events[:overflow]
+            self._changed.notify_all()
+
+    async def finish(self) -> None:
+        async with self._changed:
+            self.finished_at = time.monotonic()
+            self._changed.notify_all()
+
+    def _subscribe(self) -> None:
+        self.subscribers += 1
+        if self._abandon_timer is not None:
+            self._abandon_timer.cancel()
+            self._abandon_timer = None
+
+    def _unsubscribe(self) -> None:
+        self.subscribers -= 1
+        if self.subscribers == 0 and not self.finished and self.task is not None:
+            # Give the client a chance to reconnect with Last-Event-ID before giving up on it
+            loop = asyncio.get_running_loop()
+            self._abandon_timer = loop.call_later(settings.SSE_ABANDON_GRACE, self._abandon)
+
+    def _abandon(self) -> None:
+        self._abandon_timer = None
+        if self.subscribers == 0 and not self.finished and self.task is not None:
+            logger.info(f"No client left on stream {self.stream_id}; cancelling its pipeline")
+            self.task.cancel(msg="client_disconnect")
+
+    async def read_from(self, after_seq: int) -> AsyncIterator[bytes]:
+        """
+        Yields every event with a sequence number above after_seq, then
+        follows the live stream. Emits heartbeats while waiting. When the
+        last reader goes away mid-stream, the pipeline is cancelled after
+        SSE_ABANDON_GRACE seconds unless a client resumes it.
+        """
+        self._subscribe()
+        try:
+            async for encoded in self._follow(after_seq):
+                yield encoded
+        finally:
+            self._unsubscribe()
+
+    async def _follow(self, after_seq: int) -> AsyncIterator[bytes]:
+        position = after_seq + 1
+        while True:
+            async with self._changed:
+                pending = [encoded for seq, encoded in self.events if seq >= position]
+                if not pending and not self.finished:
+                    try:
+                        await asyncio.wait_for(self._changed.wait(), timeout=settings.SSE_HEARTBEAT_INTERVAL)
+                    except asyncio.TimeoutError:
+                        pass
+                    pending = [encoded for seq, encoded in self.events if seq >= position]
+                finished = self.finished
+                position = self.next_seq
+
+            if pending:
+                for encoded in pending:
+                    yield encoded
+            elif finished:
+                return
+            else:
+                yield SSEEncoder.HEARTBEAT
+
+class StreamRegistry:
+    """
+    Keeps recent streams around for SSE_REPLAY_TTL seconds so clients can
+    resume them. A new question from a session supersedes the one it still
+    has running: the user resent or moved on, so that answer is never read.
+    """
+
+    def __init__(self):
+        self.streams: Dict[str, ChatStream] = {}
+        self.latest_by_session: Dict[str, ChatStream] = {}
+
+    def create(self, session_id: Optional[str] = None) -> ChatStream:
+        self._purge_expired()
+        stream = ChatStream(uuid.uuid4().hex, session_id)
+        self.streams[stream.stream_id] = stream
+        if session_id is not None:
+            previous = self.latest_by_session.get(session_id)
+            if previous is not None and not previous.finished and previous.task is not None:
+                logger.info(f"Stream {previous.stream_id} superseded by a new question; cancelling its pipeline")
+                previous.task.cancel(msg="superseded")
+            self.latest_by_session[session_id] = stream
+        return stream
+
+    def get(self, stream_id: str) -> Optional[ChatStream]:
+        self._purge_expired()
+        return self.streams.get(stream_id)
+
+    def _purge_expired(self) -> None:
+        now = time.monotonic()
+        expired = [
+            stream_id for stream_id, stream in self.streams.items()
+            if stream.finished and now - stream.finished_at > settings.SSE_REPLAY_TTL
+        ]
+        for stream_id in expired:
+            stream = self.streams.pop(stream_id)
+            if self.latest_by_session.get(stream.session_id) is stream:
+                del self.latest_by_session[stream.session_id]
+
+    def __len__(self) -> int:
+        return len(self.streams)
+
+stream_registry = StreamRegistry()
+
+def parse_last_event_id(value: Optional[str]) -> Optional[Tuple[str, int]]:
+    """Splits a 'stream_id:seq' Last-Event-ID header; None if absent or malformed."""
+    if not value or ":" not in value:
+        return None
+    stream_id, _, seq = value.rpartition(":")
+    try:
+        return stream_id, int(seq)
+    except ValueError:
+        return None
+
+async def encode_stream(chunks: AsyncIterator[bytes], compress: bool) -> AsyncIterator[bytes]:
+    """Optionally gzip a stream of already framed SSE chunks."""
+    if not compress:
+        async for chunk in chunks:
+            yield chunk
+        return
+
+    gzip_stream = GzipEventStream(settings.SSE_GZIP_LEVEL)
+    async for chunk in chunks:
+        yield gzip_stream.compress(chunk)
+    yield gzip_stream.finish()
@@ -0,0 +1,212 @@
+# app/timeseries.py
+# Year-partitioned store for multi-year trend questions. Each yearly table
+# ("ingressdata<year>") is unpivoted into groundwater_series with deltas
+# precomputed at load time. Build it with: python -m app.timeseries 2017 2020 2025
+import sys
+from typing import Iterable, List, Optional, Tuple
+from sqlalchemy import text
+from .db import COLUMNS, get_engine, read_dicts, routed_read
+from .gazetteer import get_gazetteer
+from .logger import get_logger
+from .tracing import traced
+
+logger = get_logger(__name__)
+
+# Numeric columns that are stored as series
+METRICS = [column for column in COLUMNS if column not in ("STATES", "DISTRICT")]
+
+create_series_table_sql = """
+CREATE TABLE IF NOT EXISTS public.groundwater_series (
+    year INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    district TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    value DOUBLE PRECISION,
+    delta DOUBLE PRECISION,
+    growth_rate DOUBLE PRECISION,
+    PRIMARY KEY (state, district, metric, year)
+) PARTITION BY RANGE (year);
+"""
+
+# Range-scan indexes; INCLUDE lets trend reads be answered from the index alone
+create_series_indexes_sql = [
+    """CREATE INDEX IF NOT EXISTS ix_groundwater_series_district
+       ON public.groundwater_series (lower(district), metric, year) INCLUDE (state, value, delta, growth_rate);""",
+    """CREATE INDEX IF NOT EXISTS ix_groundwater_series_state
+       ON public.groundwater_series (lower(state), metric, year) INCLUDE (district, value, delta, growth_rate);""",
+]
+
+refresh_deltas_sql = """
+UPDATE public.groundwater_series AS s
+SET delta = s.value - p.prev_value,
+    growth_rate = CASE WHEN p.prev_value <> 0 THEN (s.value - p.prev_value) / abs(p.prev_value) * 100 END
+FROM (
+    SELECT state, district, metric, year,
+           LAG(value) OVER (PARTITION BY state, district, metric ORDER BY year) AS prev_value
+    FROM public.groundwater_series
+) AS p
+WHERE s.state = p.state AND s.district = p.district AND s.metric = p.metric AND s.year = p.year;
+"""
+
+def ensure_timeseries_schema(years: Iterable[int]) -> None:
+    """
+    Creates the partitioned table, its indexes and one partition per year.
+    """
+    with get_engine().begin() as conn:
+        conn.execute(text(create_series_table_sql))
+        for index_sql in create_series_indexes_sql:
+            conn.execute(text(index_sql))
+        for year in years:
+            year = int(year)
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS public.groundwater_series_{year} "
+                f"PARTITION OF public.groundwater_series FOR VALUES FROM ({year}) TO ({year + 1});"
+            ))
+
+def load_year(year: int) -> None:
+    """
+    Replaces one year's partition with the unpivoted contents of "ingressdata<year>".
+    """
+    year = int(year)
+    values_sql = ", ".join(f"('{metric}', \"{metric}\"::double precision)" for metric in METRICS)
+    insert_sql = f"""
+    INSERT INTO public.groundwater_series (year, state, district, metric, value)
+    SELECT {year}, src."STATES", src."DISTRICT", m.metric, m.value
+    FROM public."ingressdata{year}" AS src
+    CROSS JOIN LATERAL (VALUES {values_sql}) AS m(metric, value)
+    WHERE src."STATES" IS NOT NULL AND src."DISTRICT" IS NOT NULL
+    """
+    with get_engine().begin() as conn:
+        conn.execute(text(f"TRUNCATE public.groundwater_series_{year}"))
+        conn.execute(text(insert_sql))
+    logger.info(f"Loaded groundwater series for {year}")
+
+def refresh_deltas() -> None:
+    """Recomputes year-over-year deltas and growth rates for every series."""
+    with get_engine().begin() as conn:
+        conn.execute(text(refresh_deltas_sql))
+
+def build_timeseries(years: Iterable[int]) -> None:
+    years = sorted({int(year) for year in years})
+    ensure_timeseries_schema(years)
+    for year in years:
+        load_year(year)
+    refresh_deltas()
+    logger.info(f"Groundwater series built for years: {years}")
+
+def get_year_range(filters: dict) -> Optional[Tuple[int, int]]:
+    """
+    Reads the year filter produced by the NLU step. Accepts
+    {"years": {"from": 2017, "to": 2025}} or a list of years, whose min/max
+    are used. Returns None for single-snapshot questions.
+    """
+    years = filters.get('years')
+    if not years:
+        return None
+    try:
+        if isinstance(years, dict):
+            year_from = int(years.get('from') or years.get('to'))
+            year_to = int(years.get('to') or years.get('from'))
+        elif isinstance(years, (list, tuple)):
+            year_from, year_to = int(min(years)), int(max(years))
+        else:
+            year_from = year_to = int(years)
+    except (TypeError, ValueError):
+        logger.warning(f"Ignoring unparseable year filter: {years}")
+        return None
+    return min(year_from, year_to), max(year_from, year_to)
+
+def _resolve_names(field: str, value) -> Optional[List[str]]:
+    """
+    Lower-cased known state/district names containing value, i.e. what
+    ILIKE '%value%' selects on the snapshot table (so "Bengaluru" gives both
+    Bengaluru districts). None when the gazetteer is unavailable or knows no
+    such name, e.g. a district renamed since an earlier assessment.
+    """
+    try:
+        gazetteer = get_gazetteer()
+    except Exception as e:
+        logger.warning(f"Gazetteer unavailable, matching {field} by substring: {e}")
+        return None
+    names = gazetteer["states"] if field == "state" else [loc["district"] for loc in gazetteer["districts"]]
+    needle = str(value).lower()
+    return sorted({name.lower() for name in names if needle in name.lower()}) or None
+
+def _build_trend_query(filters: dict, year_range: Tuple[int, int], metrics: List[str]) -> Tuple[str, dict]:
+    query_builder = [
+        "SELECT state, district, metric, year, value, delta, growth_rate",
+        "FROM public.groundwater_series",
+        "WHERE year BETWEEN :year_from AND :year_to AND metric = ANY(:metrics)",
+    ]
+    params = {"year_from": year_range[0], "year_to": year_range[1], "metrics": metrics}
+
+    for field in ("district", "state"):
+        if field not in filters:
+            continue
+        # Same substring semantics as every other read path; exact names keep the lower() index usable
+        names = _resolve_names(field, filters[field])
+        if names:
+            query_builder.append(f"AND lower({field}) = ANY(:{field}_names)")
+            params[f"{field}_names"] = names
+        else:
+            query_builder.append(f"AND {field} ILIKE :{field}")
+            params[field] = f"%{filters[field]}%"
+
+    query_builder.append("ORDER BY state, district, metric, year")
+    return " ".join(query_builder), params
+
+@traced("db.execute_trend_query")
+def execute_trend_query(filters: dict, year_range: Tuple[int, int], metrics: Optional[List[str]] = None) -> list:
+    """
+    Reads every (district, metric) series matching the filters within the
+    year range in one range scan. Location names match as substrings,
+    case-insensitively, like the single-year queries.
+    """
+    metrics = [metric for metric in (metrics or []) if metric in METRICS] or METRICS
+    sql, params = _build_trend_query(filters, year_range, metrics)
+
+    try:
+        # The snapshot only holds the current year, so there is no fallback here
+        return routed_read(read_dicts(text(sql), params))
+    except Exception as e:
+        logger.error(f"Trend query failed: {e}")
+        return []
+
+def summarize_trends(rows: list) -> list:
+    """
+    Groups series rows per (state, district, metric) and adds the overall
+    change, percentage change and compound annual growth rate.
+    """
+    series = {}
+    for row in rows:
+        key = (row['state'], row['district'], row['metric'])
+        series.setdefault(key, []).append(row)
+
+    summaries = []
+    for (state, district, metric), points in series.items():
+        points = sorted(points, key=lambda point: point['year'])
+        known = [point for point in points if point['value'] is not None]
+        summary = {
+            "STATES": state,
+            "DISTRICT": district,
+            "metric": metric,
+            "points": [
+                {"year": p['year'], "value": p['value'], "delta": p['delta'], "growth_rate": p['growth_rate']}
+                for p in points
+            ],
+        }
+        if len(known) >= 2:
+            first, last = known[0], known[-1]
+            span_years = last['year'] - first['year']
+            summary["from_year"] = first['year']
+            summary["to_year"] = last['year']
+            summary["total_change"] = last['value'] - first['value']
+            if first['value']:
+                summary["percent_change"] = (last['value'] - first['value']) / abs(first['value']) * 100
+            if span_years > 0 and first['value'] and first['value'] > 0 and last['value'] >= 0:
+                summary["cagr_percent"] = ((last['value'] / first['value']) ** (1 / span_years) - 1) * 100
+        summaries.append(summary)
+    return summaries
+
+if __name__ == "__main__":
+    build_timeseries(int(arg) for arg in sys.argv[1:])
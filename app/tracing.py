@@ -0,0 +1,116 @@
+# app/tracing.py
+import json
+import os
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Dict, List, Optional
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+# The trace for the current request, or None when tracing is off for it
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("ingres_trace", default=None)
+
+class Trace:
+    """
+    Collects timed spans for a single request and exports them in the
+    Chrome trace event format (load the file in chrome://tracing or Perfetto).
+    """
+
+    def __init__(self, name: str, trace_id: Optional[str] = None):
+        self.name = name
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.start_time = time.perf_counter()
+        self.events: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def add_span(self, name: str, start: float, end: float, args: Dict[str, Any]) -> None:
+        event = {
+            "name": name,
+            "cat": "ingres",
+            "ph": "X",
+            "ts": round((start - self.start_time) * 1e6, 1),
+            "dur": round((end - start) * 1e6, 1),
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": args,
+        }
+        with self._lock:
+            self.events.append(event)
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        return {
+            "traceEvents": sorted(self.events, key=lambda event: event["ts"]),
+            "displayTimeUnit": "ms",
+            "otherData": {"trace_id": self.trace_id, "name": self.name},
+        }
+
+    def dump(self, directory: str) -> str:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{self.trace_id}.trace.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome_trace(), f, default=str)
+        return path
+
+class _Span:
+    __slots__ = ("trace", "name", "args", "start")
+
+    def __init__(self, trace: Trace, name: str, args: Dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.trace.add_span(self.name, self.start, time.perf_counter(), self.args)
+        return False
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+def span(name: str, **args: Any):
+    """
+    Times the enclosed block as a span of the current trace. When the request
+    is not traced this is a single context-variable lookup.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return _NULL_SPAN
+    return _Span(trace, name, args)
+
+def traced(name: str):
+    """Decorator form of span() for whole functions."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def start_trace(name: str):
+    """Makes a new trace current; returns (trace, token) for end_trace()."""
+    trace = Trace(name)
+    return trace, _current_trace.set(trace)
+
+def end_trace(token) -> None:
+    _current_trace.reset(token)
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
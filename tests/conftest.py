@@ -0,0 +1,22 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pytest
+from app import cache, prefetch
+from app.cache import LRUCache
+
+EMPTY_GAZETTEER = {"states": [], "districts": []}
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    """
+    Gives every test its own empty shared cache, so cached NLU/NLG results never leak between tests.
+    """
+    monkeypatch.setattr(cache, "_cache", LRUCache(max_entries=1000))
+
+@pytest.fixture(autouse=True)
+def offline_gazetteer(monkeypatch):
+    """
+    Keeps speculative prefetch from loading the gazetteer out of a real database; tests that need names patch their own.
+    """
+    monkeypatch.setattr(prefetch, "loaded_gazetteer", lambda: EMPTY_GAZETTEER)
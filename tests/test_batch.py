@@ -0,0 +1,66 @@
+import sys
+import os
+import asyncio
+import json
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import services
+from app.db import rows_matching_filters
+from app.services import ChatService, filters_from
+from app.api.schemas import BatchChatRequest
+
+ROWS = [
+    {"STATES": "KARNATAKA", "DISTRICT": "Bengaluru South"},
+    {"STATES": "KARNATAKA", "DISTRICT": "Mysuru"},
+    {"STATES": "TAMILNADU", "DISTRICT": "Chennai"},
+]
+
+def test_rows_matching_filters_uses_ilike_semantics():
+    """
+    Tests that in-memory filtering matches case-insensitive substrings.
+    """
+    assert len(rows_matching_filters(ROWS, {"state": "karnataka"})) == 2
+    assert rows_matching_filters(ROWS, {"district": "bengaluru"}) == ROWS[:1]
+    assert rows_matching_filters(ROWS, {"state": "tamil", "district": "mysuru"}) == []
+    assert rows_matching_filters(ROWS, {}) == ROWS
+
+def test_batch_stream_shares_db_and_nlg_calls(monkeypatch):
+    """
+    Tests that a batch issues one DB query and one NLG call per distinct question.
+    """
+    db_calls = []
+    nlg_calls = []
+    monkeypatch.setattr(services, "get_json_from_query", lambda q: {"filters": {"district": q.split()[-1]}})
+    monkeypatch.setattr(services, "execute_batch_query", lambda filters: db_calls.append(filters) or ROWS)
+    monkeypatch.setattr(services, "get_english_from_data", lambda q, rows: nlg_calls.append(q) or f"{len(rows)} rows")
+
+    request = BatchChatRequest(session_id="batch", queries=["data for Chennai", "data for Mysuru", "data for Chennai"])
+
+    async def collect():
+        return [json.loads(line) async for line in ChatService().generate_batch_stream(request)]
+
+    items = asyncio.run(collect())
+    results = sorted((i for i in items if i["type"] == "result"), key=lambda i: i["index"])
+
+    assert len(db_calls) == 1
+    assert sorted(nlg_calls) == ["data for Chennai", "data for Mysuru"]
+    assert [r["response_text"] for r in results] == ["1 rows", "1 rows", "1 rows"]
+    assert items[-1] == {"type": "done", "count": 3, "llm_nlg_calls": 2, "llm_nlu_calls": 2}
+
+def test_batch_survives_malformed_nlu_output(monkeypatch):
+    """
+    Tests that null or non-object NLU results are treated as unfiltered instead of ending the stream.
+    """
+    outputs = {"data for Chennai": {"filters": None}, "data for Mysuru": ["not", "a", "dict"]}
+    monkeypatch.setattr(services, "get_json_from_query", lambda q: outputs[q])
+    monkeypatch.setattr(services, "execute_batch_query", lambda filters: ROWS)
+    monkeypatch.setattr(services, "get_english_from_data", lambda q, rows: f"{len(rows)} rows")
+
+    request = BatchChatRequest(session_id="batch", queries=["data for Chennai", "data for Mysuru"])
+
+    async def collect():
+        return [json.loads(line) async for line in ChatService().generate_batch_stream(request)]
+
+    items = asyncio.run(collect())
+    assert [item["response_text"] for item in items[:-1]] == ["3 rows", "3 rows"]
+    assert filters_from("not json") == {} and filters_from({"filters": {"state": "Goa"}}) == {"state": "Goa"}
+    assert items[-1]["type"] == "done" and items[-1]["count"] == 2
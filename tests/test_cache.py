@@ -0,0 +1,91 @@
+import sys
+import os
+import pickle
+import sqlite3
+import time
+from decimal import Decimal
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import cache as cache_module
+from app.cache import LRUCache, NullCache, SQLiteCache, TieredCache, serialize, deserialize
+from app.config import settings
+
+def test_serialize_round_trip_compresses_large_values():
+    """
+    Tests that values survive serialization and large ones are compressed.
+    """
+    rows = [{"DISTRICT": f"District {i}", "RainfallTotal": Decimal(i)} for i in range(100)]
+    blob = serialize(rows)
+
+    assert deserialize(blob) == rows
+    assert blob[:1] == b"\x01"
+    assert deserialize(serialize("hi")) == "hi"
+
+def test_lru_cache_evicts_least_recently_used_and_expired():
+    """
+    Tests LRU eviction order and per-entry expiry.
+    """
+    cache = LRUCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+
+    cache.set("short", 4, ttl=-1)
+    assert cache.get("short") is None
+
+def test_sqlite_cache_is_shared_and_first_writer_wins(tmp_path):
+    """
+    Tests that two independent instances (as two workers would) share entries and agree on one value.
+    """
+    path = str(tmp_path / "cache.sqlite3")
+    worker_one = SQLiteCache(path, max_entries=100)
+    worker_two = SQLiteCache(path, max_entries=100)
+
+    assert worker_one.get_or_set("nlu:x", lambda: {"filters": {"state": "Kerala"}}) == {"filters": {"state": "Kerala"}}
+    assert worker_two.get_or_set("nlu:x", lambda: {"filters": {}}) == {"filters": {"state": "Kerala"}}
+    assert worker_two.get_or_set("nlu:none", lambda: None) is None
+    assert worker_one.size() == 1
+
+def test_tiered_cache_fills_local_tier_from_shared(tmp_path):
+    """
+    Tests that a value written through one tiered cache is served locally by another after one shared read.
+    """
+    path = str(tmp_path / "cache.sqlite3")
+    writer = TieredCache(LRUCache(10), SQLiteCache(path, 100), local_ttl=60)
+    reader = TieredCache(LRUCache(10), SQLiteCache(path, 100), local_ttl=60)
+
+    writer.set("answer:1", "text", ttl=300)
+    assert reader.get("answer:1") == "text"
+    assert reader.local.get("answer:1") == "text"
+    assert reader.get_or_set("answer:1", lambda: time.time()) == "text"
+
+class _Payload:
+    def __reduce__(self):
+        return (os.system, ("echo planted",))
+
+def test_planted_pickle_is_never_loaded(tmp_path):
+    """
+    Tests that an entry not written as JSON is discarded instead of being unpickled.
+    """
+    path = str(tmp_path / "cache.sqlite3")
+    cache = SQLiteCache(path, max_entries=100)
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "INSERT INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            ("nlu:x", b"\x00" + pickle.dumps(_Payload()), time.time() + 60)
+        )
+
+    assert cache.get("nlu:x") is None
+    assert cache.get_or_set("nlu:x", lambda: {"filters": {}}) == {"filters": {}}
+
+def test_shared_backend_requires_explicit_path(monkeypatch):
+    """
+    Tests that the SQLite tier has no default file location.
+    """
+    monkeypatch.setattr(cache_module, "_cache", None)
+    monkeypatch.setattr(settings, "CACHE_BACKEND", "tiered")
+    monkeypatch.setattr(settings, "CACHE_SQLITE_PATH", None)
+    assert isinstance(cache_module.get_cache(), NullCache)
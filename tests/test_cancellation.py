@@ -0,0 +1,278 @@
+import sys
+import os
+import asyncio
+import contextvars
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pytest
+import requests
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from app import cancellation
+from app.cancellation import CancelToken, CancellationStats, current_cancel_token, on_cancel
+from app.config import settings
+from app.db import read_dicts
+from app.exceptions import RequestCancelledError
+from app.llm_utils import AbortableHTTPAdapter, _abort_connection
+from app.services import ChatService
+from app.api.schemas import ChatRequest
+
+SLOW_QUERY = "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) SELECT count(*) AS c FROM n"
+
+def _run_cancelled_after(func, delay=0.2):
+    """Runs func in a thread under a fresh token and cancels the token after delay."""
+    token = CancelToken()
+    context = contextvars.copy_context()
+    context.run(current_cancel_token.set, token)
+    outcome = {}
+
+    def target():
+        try:
+            outcome["result"] = context.run(func)
+        except Exception as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=target)
+    start_time = time.monotonic()
+    thread.start()
+    time.sleep(delay)
+    token.cancel()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    return outcome, time.monotonic() - start_time
+
+def test_on_cancel_refuses_new_work_after_cancel():
+    """
+    Tests that callbacks run once and that cancelled pipelines start no new calls.
+    """
+    token = CancelToken()
+    calls = []
+    reset = current_cancel_token.set(token)
+    try:
+        with on_cancel(lambda: calls.append("abort")):
+            token.cancel()
+            token.cancel()
+        assert calls == ["abort"]
+        with pytest.raises(RequestCancelledError):
+            with on_cancel(lambda: None):
+                pass
+    finally:
+        current_cancel_token.reset(reset)
+
+def test_released_registration_never_aborts():
+    """
+    Tests that releasing waits for a running abort and blocks any later one.
+    """
+    token = CancelToken()
+    aborted = []
+    started = threading.Event()
+
+    def slow_abort():
+        started.set()
+        time.sleep(0.1)
+        aborted.append("late")
+
+    registration = token.register(slow_abort)
+    canceller = threading.Thread(target=token.cancel)
+    canceller.start()
+    started.wait(1)
+    registration.release()
+    # release() returned only after the running abort finished
+    assert aborted == ["late"]
+    canceller.join()
+
+    other = CancelToken()
+    released = other.register(lambda: aborted.append("after release"))
+    released.release()
+    other.cancel()
+    assert aborted == ["late"]
+
+def test_scope_runs_aborts_off_the_event_loop():
+    """
+    Tests that cancelling a pipeline runs its abort callbacks in a worker thread.
+    """
+    abort_threads = []
+
+    async def pipeline():
+        with cancellation.cancellation_scope():
+            current_cancel_token.get().register(lambda: abort_threads.append(threading.get_ident()))
+            await asyncio.sleep(30)
+
+    async def run():
+        task = asyncio.create_task(pipeline())
+        await asyncio.sleep(0.01)
+        task.cancel(msg="test")
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0.05)
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(run())
+    assert len(abort_threads) == 1
+    assert abort_threads[0] != loop_thread
+
+def test_aborts_run_while_default_executor_is_saturated():
+    """
+    Tests that an abort does not wait behind the blocked calls filling the default executor.
+    """
+    release = threading.Event()
+    aborted = threading.Event()
+
+    async def pipeline():
+        with cancellation.cancellation_scope():
+            current_cancel_token.get().register(aborted.set)
+            await asyncio.sleep(30)
+
+    async def run():
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=2))
+        blockers = [asyncio.create_task(asyncio.to_thread(release.wait, 5)) for _ in range(2)]
+        try:
+            task = asyncio.create_task(pipeline())
+            await asyncio.sleep(0.05)
+            task.cancel(msg="test")
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            for _ in range(50):
+                if aborted.is_set():
+                    break
+                await asyncio.sleep(0.01)
+            # Every default worker is still blocked at this point
+            return aborted.is_set() and not any(blocker.done() for blocker in blockers)
+        finally:
+            release.set()
+            await asyncio.gather(*blockers)
+
+    assert asyncio.run(run())
+
+def test_new_question_supersedes_running_stream(monkeypatch):
+    """
+    Tests that a session's unfinished stream is cancelled when it asks another question.
+    """
+    stats = CancellationStats()
+    monkeypatch.setattr(cancellation, "cancellation_stats", stats)
+
+    async def events(self, request):
+        yield {"type": "status", "message": "working"}
+        await asyncio.sleep(30)
+    monkeypatch.setattr(ChatService, "stream_events", events)
+
+    async def run():
+        service = ChatService()
+        first = service.start_stream(ChatRequest(session_id="tab-1", query="groundwater in Pune"))
+        other = service.start_stream(ChatRequest(session_id="tab-2", query="groundwater in Pune"))
+        await asyncio.sleep(0.01)
+        second = service.start_stream(ChatRequest(session_id="tab-1", query="groundwater in Nashik"))
+        await asyncio.sleep(0.05)
+        outcome = (first.task.cancelled(), other.task.done(), second.task.done())
+        other.task.cancel()
+        second.task.cancel()
+        return outcome
+
+    assert asyncio.run(run()) == (True, False, False)
+    assert stats.pipelines["superseded"] == 1
+
+def test_abandoned_stream_cancels_pipeline(monkeypatch):
+    """
+    Tests that a stream nobody reads any more is cancelled after the grace period.
+    """
+    stats = CancellationStats()
+    monkeypatch.setattr(cancellation, "cancellation_stats", stats)
+    monkeypatch.setattr(settings, "SSE_ABANDON_GRACE", 0.05)
+
+    async def slow_events(self, request):
+        cancellation.enter_stage("nlu")
+        yield {"type": "status", "message": "working"}
+        await asyncio.sleep(30)
+    monkeypatch.setattr(ChatService, "stream_events", slow_events)
+
+    async def run():
+        stream = ChatService().start_stream(ChatRequest(session_id="c", query="groundwater in Pune"))
+        reader = stream.read_from(-1)
+        await reader.__anext__()
+        await reader.aclose()
+        await asyncio.sleep(0.2)
+        return stream
+
+    stream = asyncio.run(run())
+    assert stream.task.cancelled()
+    assert stream.finished
+    assert b'"cancelled"' in stream.events[-1][1]
+    assert stats.pipelines == {"client_disconnect": 1}
+    assert stats.skipped_stages == {"db": 1, "nlg": 1}
+
+def test_resumed_stream_is_not_cancelled(monkeypatch):
+    """
+    Tests that reconnecting within the grace period keeps the pipeline running.
+    """
+    monkeypatch.setattr(settings, "SSE_ABANDON_GRACE", 0.1)
+
+    async def events(self, request):
+        yield {"type": "status", "message": "working"}
+        await asyncio.sleep(0.2)
+        yield {"type": "answer", "text": "done"}
+    monkeypatch.setattr(ChatService, "stream_events", events)
+
+    async def run():
+        stream = ChatService().start_stream(ChatRequest(session_id="c", query="groundwater in Pune"))
+        reader = stream.read_from(-1)
+        await reader.__anext__()
+        await reader.aclose()
+        await asyncio.sleep(0.05)
+        return stream, [chunk async for chunk in stream.read_from(0)]
+
+    stream, chunks = asyncio.run(run())
+    assert not stream.task.cancelled()
+    assert b'"answer"' in chunks[0]
+
+def test_cancel_interrupts_running_statement(monkeypatch, tmp_path):
+    """
+    Tests that cancelling the token cancels the database statement in flight.
+    """
+    stats = CancellationStats()
+    monkeypatch.setattr("app.db.cancellation_stats", stats)
+    engine = create_engine(f"sqlite:///{tmp_path / 'slow.db'}")
+
+    def query():
+        with engine.connect() as conn:
+            return read_dicts(text(SLOW_QUERY))(conn)
+
+    outcome, elapsed = _run_cancelled_after(query)
+    assert isinstance(outcome.get("error"), OperationalError)
+    assert elapsed < 3
+    assert stats.db_queries_cancelled == 1
+
+def test_cancel_aborts_pending_http_request(monkeypatch):
+    """
+    Tests that cancelling the token shuts down the socket of a request awaiting its response.
+    """
+    stats = CancellationStats()
+    monkeypatch.setattr("app.llm_utils.cancellation_stats", stats)
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+    session = requests.Session()
+    session.mount("http://", AbortableHTTPAdapter())
+
+    def post():
+        return session.post(f"http://127.0.0.1:{server.getsockname()[1]}/v1/chat/completions", json={}, timeout=10)
+
+    try:
+        outcome, elapsed = _run_cancelled_after(post)
+    finally:
+        server.close()
+    assert isinstance(outcome.get("error"), requests.exceptions.ConnectionError)
+    assert elapsed < 3
+    assert stats.http_requests_aborted == 1
+
+def test_unconnected_http_connection_is_not_counted(monkeypatch):
+    """
+    Tests that only sockets actually shut down count as aborted requests.
+    """
+    stats = CancellationStats()
+    monkeypatch.setattr("app.llm_utils.cancellation_stats", stats)
+    _abort_connection(SimpleNamespace(sock=None))
+    assert stats.http_requests_aborted == 0
@@ -0,0 +1,75 @@
+import sys
+import os
+import gzip
+import json
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from decimal import Decimal
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app import export
+from app.api import endpoints
+from app.export import encode_csv, encode_ndjson, export_rows, gzip_chunks
+from app.replicas import NoReadNodeAvailable
+
+ROWS = [
+    {"STATES": "Karnataka", "DISTRICT": "Bengaluru", "RainfallTotal": Decimal("1200.5")},
+    {"STATES": "Tamil Nadu", "DISTRICT": "Chennai", "RainfallTotal": 1400.0},
+]
+
+def test_encode_csv_writes_header_once():
+    """
+    Tests that CSV export emits the header once followed by every batch.
+    """
+    body = b"".join(encode_csv([ROWS[:1], ROWS[1:]])).decode("utf-8")
+    lines = body.strip().splitlines()
+
+    assert lines[0].startswith("STATES,DISTRICT,RainfallTotal")
+    assert len(lines) == 3
+    assert lines[2].startswith("Tamil Nadu,Chennai,1400.0")
+
+def test_encode_ndjson_serializes_decimals():
+    """
+    Tests that NDJSON export produces one JSON object per row.
+    """
+    body = b"".join(encode_ndjson([ROWS])).decode("utf-8")
+    records = [json.loads(line) for line in body.strip().splitlines()]
+
+    assert records[0]["RainfallTotal"] == 1200.5
+    assert records[1]["DISTRICT"] == "Chennai"
+
+def test_gzip_chunks_round_trip():
+    """
+    Tests that the incremental gzip stream decompresses to the original body.
+    """
+    chunks = list(encode_ndjson([ROWS, ROWS]))
+    compressed = b"".join(gzip_chunks(chunks, level=6))
+
+    assert gzip.decompress(compressed) == b"".join(chunks)
+
+def test_export_failure_midway_aborts_the_stream(monkeypatch):
+    """
+    Tests that an error after some rows propagates instead of ending the export as if complete.
+    """
+    def stream_query(filters):
+        yield ROWS[:1]
+        raise ConnectionError("connection lost")
+    monkeypatch.setattr(export, "stream_query", stream_query)
+
+    chunks = export_rows({}, "csv", compress=True)
+    with pytest.raises(ConnectionError):
+        b"".join(chunks)
+
+def test_export_returns_503_when_database_is_unreachable(monkeypatch):
+    """
+    Tests that a failure before the first row is reported with an error status, not an empty 200.
+    """
+    def stream_query(filters):
+        raise NoReadNodeAvailable("no node")
+        yield
+    monkeypatch.setattr(export, "stream_query", stream_query)
+    app = FastAPI()
+    app.include_router(endpoints.router)
+
+    response = TestClient(app).post("/data/export", json={"filters": {}, "format": "csv"})
+    assert response.status_code == 503
@@ -0,0 +1,113 @@
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from app import health
+from app.config import settings
+from app.health import DatabasePinger
+from app.llm_utils import CircuitBreaker
+from app.main import app
+
+class StubNode:
+    def __init__(self, name):
+        self.name = name
+        self.healthy = True
+        self.latency_ms = 3.0
+        self.error = None
+
+class StubRouter:
+    """Read router whose node health the test sets directly; counts probes."""
+
+    def __init__(self):
+        self.nodes = [StubNode("primary")]
+        self.probes = 0
+
+    async def probe_all(self):
+        self.probes += 1
+
+    def stats(self):
+        return {"nodes": [node.name for node in self.nodes]}
+
+@pytest.fixture
+def ready_client(monkeypatch, tmp_path):
+    """A client for the real app with the router, circuit and engine stubbed; lifespan is not run."""
+    router = StubRouter()
+    circuit = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}")
+    monkeypatch.setattr(settings, "HEALTH_DB_PING_TTL", 60.0)
+    monkeypatch.setattr(health, "db_pinger", DatabasePinger())
+    monkeypatch.setattr(health, "get_read_router", lambda: router)
+    monkeypatch.setattr(health, "get_llm_circuit", lambda: circuit)
+    monkeypatch.setattr(health, "get_engine", lambda: engine)
+    yield TestClient(app), router, circuit
+    engine.dispose()
+
+def test_circuit_opens_after_threshold_and_recovers():
+    """
+    Tests that the LLM circuit opens after repeated failures and closes after a successful trial.
+    """
+    circuit = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+
+    circuit.record_failure()
+    assert circuit.state == CircuitBreaker.CLOSED
+    circuit.record_failure()
+    assert circuit.state == CircuitBreaker.OPEN
+    assert circuit.allow_request() is False
+
+    time.sleep(0.06)
+    assert circuit.state == CircuitBreaker.HALF_OPEN
+    assert circuit.allow_request() is True
+    # Only one trial request is let through while half-open
+    assert circuit.allow_request() is False
+
+    circuit.record_success()
+    assert circuit.state == CircuitBreaker.CLOSED
+
+def test_ready_reports_pool_and_in_flight(ready_client):
+    """
+    Tests that /health/ready returns 200 with pool and in-flight stats when all dependencies are up.
+    """
+    client, router, circuit = ready_client
+    response = client.get("/health/ready")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "ready"
+    assert body["services"] == {"database": "healthy", "llm": "healthy"}
+    assert "checkedout" in body["details"]["database"]["pool"]
+    assert body["details"]["database"]["read_routing"] == {"nodes": ["primary"]}
+    assert "total" in body["details"]["in_flight_requests"]
+
+def test_ready_is_503_when_a_dependency_is_down(ready_client):
+    """
+    Tests that an unhealthy database or an open LLM circuit makes /health/ready return 503.
+    """
+    client, router, circuit = ready_client
+    router.nodes[0].healthy = False
+    router.nodes[0].error = "connection refused"
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["services"]["database"] == "unhealthy"
+    assert "connection refused" in response.json()["details"]["database"]["error"]
+
+    router.nodes[0].healthy = True
+    circuit.record_failure()
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["services"] == {"database": "healthy", "llm": "unhealthy"}
+
+def test_db_probe_is_cached_within_ttl(ready_client, monkeypatch):
+    """
+    Tests that repeated readiness checks probe the database once per HEALTH_DB_PING_TTL.
+    """
+    client, router, circuit = ready_client
+    for _ in range(3):
+        assert client.get("/health/ready").status_code == 200
+    assert router.probes == 1
+
+    monkeypatch.setattr(settings, "HEALTH_DB_PING_TTL", 0.0)
+    client.get("/health/ready")
+    assert router.probes == 2
@@ -0,0 +1,79 @@
+import sys
+import os
+import asyncio
+import json
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import services
+from app.intent import IntentClassifier, classify_intent, DATA, GREETING, HELP, UNSUPPORTED, SUGGESTED_QUERIES
+from app.services import ChatService
+from app.api.schemas import ChatRequest, BatchChatRequest
+
+class FakeModel:
+    classes_ = ["data", "greeting"]
+
+    def predict_proba(self, texts):
+        return [[0.1, 0.9]]
+
+def test_rules_route_common_intents():
+    """
+    Tests that chit-chat, help and off-topic queries are recognised by the rules.
+    """
+    assert classify_intent("Hello!").intent == GREETING
+    assert classify_intent("what can you do?").intent == HELP
+    assert classify_intent("tell me a joke").intent == UNSUPPORTED
+    assert classify_intent("hello, show groundwater data for Pune").intent == DATA
+
+def test_non_data_intents_include_suggestions():
+    """
+    Tests that only non-data intents carry the precomputed suggested queries.
+    """
+    assert classify_intent("hi").suggested_queries == SUGGESTED_QUERIES
+    data_intent = classify_intent("compare recharge in Pune and Nashik")
+    assert data_intent.suggested_queries is None
+    assert data_intent.requires_visualization
+
+def test_model_is_consulted_for_ambiguous_queries():
+    """
+    Tests that a loaded model decides queries the rules cannot place.
+    """
+    classifier = IntentClassifier()
+    classifier.model = FakeModel()
+    assert classifier.classify("yo what's up").intent == GREETING
+    # Queries with data keywords never leave the pipeline
+    assert classifier.classify("rainfall in Pune").intent == DATA
+
+def test_greeting_skips_llm_and_db(monkeypatch):
+    """
+    Tests that a greeting is answered without calling NLU, the DB or NLG.
+    """
+    def fail(*args):
+        raise AssertionError("pipeline should not run")
+    monkeypatch.setattr(services, "get_json_from_query", fail)
+    monkeypatch.setattr(services, "execute_query", fail)
+
+    async def collect():
+        return [event async for event in ChatService().stream_events(ChatRequest(session_id="s", query="hello"))]
+
+    events = asyncio.run(collect())
+    assert len(events) == 1
+    assert events[0]["type"] == "answer"
+    assert events[0]["intent"] == GREETING
+
+def test_batch_answers_greetings_locally(monkeypatch):
+    """
+    Tests that batch items with a non-data intent skip the NLU step.
+    """
+    nlu_calls = []
+    monkeypatch.setattr(services, "get_json_from_query", lambda q: nlu_calls.append(q) or {"filters": {"district": "Pune"}})
+    monkeypatch.setattr(services, "execute_batch_query", lambda filters: [{"STATES": "MAHARASHTRA", "DISTRICT": "Pune"}])
+    monkeypatch.setattr(services, "get_english_from_data", lambda q, rows: "answer")
+
+    request = BatchChatRequest(session_id="b", queries=["thanks", "groundwater for Pune"])
+
+    async def collect():
+        return [json.loads(line) async for line in ChatService().generate_batch_stream(request)]
+
+    items = asyncio.run(collect())
+    assert nlu_calls == ["groundwater for Pune"]
+    assert items[0]["intent"] == "thanks"
+    assert items[-1]["count"] == 2
@@ -0,0 +1,40 @@
+import sys
+import os
+import asyncio
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import lifecycle, snapshot
+from app.config import settings
+
+def test_hung_warmup_step_does_not_block_startup(monkeypatch):
+    """
+    Tests that a warmup step exceeding WARMUP_TIMEOUT is abandoned and startup continues.
+    """
+    monkeypatch.setattr(settings, "WARMUP_TIMEOUT", 0.05)
+    monkeypatch.setattr(settings, "WARMUP_STEPS", ["stuck", "quick"])
+    monkeypatch.setattr(lifecycle, "WARMUP_STEPS", {
+        "stuck": lambda: time.sleep(0.5),
+        "quick": lambda: None,
+    })
+
+    start_time = time.perf_counter()
+    asyncio.run(lifecycle.run_warmup())
+    assert lifecycle.startup_timings["stuck"] < 0.4
+    assert lifecycle.startup_timings["quick"] < 0.05
+    # asyncio.run waits for the abandoned worker thread on shutdown, nothing more
+    assert time.perf_counter() - start_time < 1
+
+def test_snapshot_warmup_loads_the_fallback(monkeypatch, tmp_path):
+    """
+    Tests that the snapshot step parses an existing snapshot and tolerates a missing one.
+    """
+    monkeypatch.setattr(settings, "DATABASE_SNAPSHOT_FALLBACK", True)
+    monkeypatch.setattr(settings, "DATABASE_SNAPSHOT_PATH", str(tmp_path / "snapshot.json"))
+    monkeypatch.setattr(snapshot, "_snapshot", None)
+
+    lifecycle.warm_snapshot()
+    assert snapshot._snapshot is None
+
+    snapshot.write_snapshot([{"STATES": "GOA", "DISTRICT": "North Goa"}])
+    lifecycle.warm_snapshot()
+    assert snapshot._snapshot[1] == [{"STATES": "GOA", "DISTRICT": "North Goa"}]
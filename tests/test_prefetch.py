@@ -0,0 +1,113 @@
+import sys
+import os
+import asyncio
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import gazetteer, prefetch, services
+from app.config import settings
+from app.prefetch import Prefetch, PrefetchStats, covers, guess_filters
+from app.services import ChatService
+from app.api.schemas import ChatRequest
+
+GAZETTEER = {
+    "states": ["KARNATAKA", "TAMILNADU"],
+    "districts": [
+        {"state": "KARNATAKA", "district": "Mysuru"},
+        {"state": "KARNATAKA", "district": "Bengaluru Urban"},
+        {"state": "TAMILNADU", "district": "Chennai"},
+    ],
+}
+
+ROWS = [
+    {"STATES": "TAMILNADU", "DISTRICT": "Chennai"},
+]
+
+def test_guess_filters_matches_whole_names(monkeypatch):
+    """
+    Tests that the local matcher finds one district or state, and gives up when ambiguous.
+    """
+    monkeypatch.setattr(prefetch, "loaded_gazetteer", lambda: GAZETTEER)
+    assert guess_filters("Groundwater in Bengaluru urban?") == {"district": "Bengaluru Urban"}
+    assert guess_filters("recharge across karnataka") == {"state": "KARNATAKA"}
+    assert guess_filters("compare Mysuru and Chennai") is None
+    assert guess_filters("chennaimalai data") is None
+
+def test_guessing_never_waits_for_the_gazetteer(monkeypatch):
+    """
+    Tests that an unloaded gazetteer yields no guess at once and loads in the background with backoff.
+    """
+    loads = []
+
+    def failing_fetch():
+        loads.append(1)
+        time.sleep(0.2)
+        raise ConnectionError("database down")
+    monkeypatch.setattr(prefetch, "loaded_gazetteer", gazetteer.loaded_gazetteer)
+    monkeypatch.setattr(gazetteer, "fetch_locations", failing_fetch)
+    monkeypatch.setattr(gazetteer, "_gazetteer", None)
+    monkeypatch.setattr(gazetteer, "_load_failures", 0)
+    monkeypatch.setattr(gazetteer, "_next_load_at", 0.0)
+    monkeypatch.setattr(settings, "GAZETTEER_RETRY_INTERVAL", 60.0)
+
+    start_time = time.perf_counter()
+    assert guess_filters("groundwater in Chennai") is None
+    assert guess_filters("groundwater in Chennai") is None
+    assert time.perf_counter() - start_time < 0.1
+
+    time.sleep(0.3)
+    assert guess_filters("groundwater in Chennai") is None
+    # One load in flight at a time, and none again until the backoff has passed
+    assert loads == [1]
+
+    monkeypatch.setattr(gazetteer, "_next_load_at", 0.0)
+    monkeypatch.setattr(gazetteer, "fetch_locations", lambda: [{"state": "TAMILNADU", "district": "Chennai"}])
+    guess_filters("groundwater in Chennai")
+    time.sleep(0.1)
+    assert guess_filters("groundwater in Chennai") == {"district": "Chennai"}
+
+def test_covers_requires_a_superset_read():
+    """
+    Tests that a guess is only used when it selects every row the NLU filters do.
+    """
+    assert covers({"district": "Chennai"}, {"district": "chennai", "state": "Tamil Nadu"})
+    assert not covers({"district": "Chennai"}, {"state": "TAMILNADU"})
+    assert not covers({"district": "Chennai"}, {"district": "Chennai", "order_by": "RainfallTotal"})
+
+def test_pipeline_uses_prefetched_rows_on_hit(monkeypatch):
+    """
+    Tests that a correct guess serves the DB stage without a second query.
+    """
+    db_calls = []
+    stats = PrefetchStats()
+    monkeypatch.setattr(prefetch, "prefetch_stats", stats)
+    monkeypatch.setattr(prefetch, "loaded_gazetteer", lambda: GAZETTEER)
+    monkeypatch.setattr(prefetch, "execute_query", lambda filters: db_calls.append(filters) or ROWS)
+    monkeypatch.setattr(services, "execute_query", lambda filters: db_calls.append(filters) or [])
+    monkeypatch.setattr(services, "get_json_from_query", lambda q: {"filters": {"district": "Chennai"}})
+    monkeypatch.setattr(services, "get_english_from_data", lambda q, rows: f"{len(rows)} rows")
+
+    async def collect():
+        request = ChatRequest(session_id="p", query="groundwater status of Chennai")
+        return [event async for event in ChatService().stream_events(request)]
+
+    events = asyncio.run(collect())
+    assert events[-1] == {"type": "answer", "text": "1 rows"}
+    assert db_calls == [{"district": "Chennai"}]
+    assert stats.hits == 1 and stats.misses == 0
+
+def test_discarded_prefetch_counts_wasted_work(monkeypatch):
+    """
+    Tests that a wrong guess is thrown away and recorded once its read finishes.
+    """
+    stats = PrefetchStats()
+    monkeypatch.setattr(prefetch, "prefetch_stats", stats)
+    monkeypatch.setattr(prefetch, "execute_query", lambda filters: ROWS * 3)
+
+    async def run():
+        speculative = Prefetch({"district": "Chennai"})
+        assert await speculative.take({"state": "KARNATAKA"}) is None
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+    assert stats.misses == 1
+    assert stats.wasted_rows == 3
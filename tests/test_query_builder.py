@@ -0,0 +1,71 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from contextlib import contextmanager
+from app import db
+from app.db import _build_query, has_ranking_filters, NUMERIC_COLUMNS
+
+def test_ranking_filters_compile_to_parameterized_top_n():
+    """
+    Tests that comparisons, ORDER BY and LIMIT become bound parameters on a whitelisted statement.
+    """
+    statement, params = _build_query({
+        "conditions": [{"field": "StageofGroundWaterExtractionTotal", "op": ">", "value": "100"}],
+        "order_by": {"field": "StageofGroundWaterExtractionTotal", "direction": "desc"},
+        "limit": 10,
+    })
+
+    assert '"StageofGroundWaterExtractionTotal" > :c0' in statement.text
+    assert statement.text.endswith('ORDER BY "StageofGroundWaterExtractionTotal" DESC NULLS LAST LIMIT :limit')
+    assert params == {"c0": 100.0, "limit": 10}
+
+def test_unsupported_filters_are_dropped():
+    """
+    Tests that unknown columns, operators and order fields never reach the SQL text.
+    """
+    statement, params = _build_query({
+        "conditions": [
+            {"field": "1=1; DROP TABLE x", "op": ">", "value": 1},
+            {"field": "RainfallTotal", "op": "LIKE", "value": 1},
+        ],
+        "order_by": {"field": "DISTRICT"},
+    })
+
+    assert "DROP" not in statement.text
+    assert "ORDER BY" not in statement.text
+    assert params == {}
+
+def test_statements_are_cached_per_shape():
+    """
+    Tests that queries with the same shape reuse one statement object.
+    """
+    first, _ = _build_query({"state": "Punjab", "limit": 5})
+    second, params = _build_query({"state": "Kerala", "limit": 3})
+    other, _ = _build_query({"district": "Pune"})
+
+    assert first is second
+    assert other is not first
+    assert params == {"state": "%Kerala%", "limit": 3}
+    assert has_ranking_filters({"limit": 3}) and not has_ranking_filters({"state": "Kerala"})
+
+def test_ranking_indexes_cover_both_directions(monkeypatch):
+    """
+    Tests that every numeric column gets an index matching each ORDER BY direction the builder emits.
+    """
+    executed = []
+
+    class RecordingEngine:
+        @contextmanager
+        def begin(self):
+            class Conn:
+                def execute(self, statement):
+                    executed.append(statement.text)
+            yield Conn()
+    monkeypatch.setattr(db, "get_engine", lambda: RecordingEngine())
+
+    db.ensure_ranking_indexes()
+    for direction in ("asc", "desc"):
+        statement, _ = _build_query({"order_by": {"field": "RainfallTotal", "direction": direction}})
+        order = statement.text.split("ORDER BY ")[1].split(" LIMIT")[0]
+        assert any(f"({order})" in ddl for ddl in executed)
+    assert len(executed) == 2 * len(NUMERIC_COLUMNS)
@@ -0,0 +1,106 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pytest
+from sqlalchemy import text
+from app import db
+from app.config import settings
+from app.db import filter_rows
+from app.replicas import NoReadNodeAvailable, ReadNode, ReadRouter
+from app.snapshot import load_snapshot, write_snapshot
+
+ROWS = [
+    {"STATES": "PUNJAB", "DISTRICT": "Ludhiana", "StageofGroundWaterExtractionTotal": 150.0},
+    {"STATES": "PUNJAB", "DISTRICT": "Pathankot", "StageofGroundWaterExtractionTotal": 60.0},
+    {"STATES": "PUNJAB", "DISTRICT": "Sangrur", "StageofGroundWaterExtractionTotal": None},
+    {"STATES": "KERALA", "DISTRICT": "Wayanad", "StageofGroundWaterExtractionTotal": 40.0},
+]
+
+def _select_one(conn):
+    return conn.execute(text("SELECT 1")).scalar()
+
+def test_router_prefers_fastest_healthy_node(tmp_path):
+    """
+    Tests that reads go to the node with the lowest EWMA latency.
+    """
+    slow = ReadNode(f"sqlite:///{tmp_path / 'slow.db'}")
+    fast = ReadNode(f"sqlite:///{tmp_path / 'fast.db'}")
+    slow.mark_up(80.0)
+    fast.mark_up(5.0)
+    fast.mark_up(15.0)
+    router = ReadRouter([slow, fast])
+
+    assert router.candidates() == [fast, slow]
+    assert router.run(_select_one) == 1
+    assert fast.reads == 1 and slow.reads == 0
+    assert fast.latency_ms == pytest.approx(0.3 * 15.0 + 0.7 * 5.0)
+
+def test_router_fails_over_when_a_node_is_down(tmp_path):
+    """
+    Tests that a connection error marks the node down and the read moves on.
+    """
+    dead = ReadNode(f"sqlite:///{tmp_path / 'missing' / 'dead.db'}")
+    alive = ReadNode(f"sqlite:///{tmp_path / 'alive.db'}")
+    router = ReadRouter([dead, alive])
+
+    assert router.run(_select_one) == 1
+    assert dead.healthy is False
+    assert router.failovers == 1
+    # Down nodes are skipped while another node is up, until their retry interval passes
+    assert router.candidates() == [alive]
+
+    # With nothing left up, down nodes are still tried rather than refused outright
+    alive.mark_down(RuntimeError("blip"))
+    assert router.run(_select_one) == 1
+    assert alive.healthy is True
+
+def test_single_node_recovers_on_next_read(tmp_path):
+    """
+    Tests that a lone database marked down is retried by the very next read.
+    """
+    directory = tmp_path / "later"
+    node = ReadNode(f"sqlite:///{directory / 'only.db'}")
+    router = ReadRouter([node])
+
+    with pytest.raises(NoReadNodeAvailable):
+        router.run(_select_one)
+    assert node.healthy is False
+
+    directory.mkdir()
+    assert router.run(_select_one) == 1
+    assert node.healthy is True
+
+def test_filter_rows_matches_sql_semantics():
+    """
+    Tests in-memory evaluation of conditions, NULL handling, ordering and limit.
+    """
+    filters = {
+        "state": "punjab",
+        "conditions": [{"field": "StageofGroundWaterExtractionTotal", "op": ">", "value": 50}],
+        "order_by": {"field": "StageofGroundWaterExtractionTotal", "direction": "asc"},
+        "limit": 5,
+    }
+    assert [row["DISTRICT"] for row in filter_rows(ROWS, filters)] == ["Pathankot", "Ludhiana"]
+
+    ranked = filter_rows(ROWS, {"order_by": {"field": "StageofGroundWaterExtractionTotal"}, "limit": 3})
+    assert [row["DISTRICT"] for row in ranked] == ["Ludhiana", "Pathankot", "Wayanad"]
+
+def test_reads_fall_back_to_snapshot(monkeypatch, tmp_path):
+    """
+    Tests that execute_query answers from the snapshot when no node is reachable.
+    """
+    snapshot_path = str(tmp_path / "snapshot.json")
+    monkeypatch.setattr(settings, "DATABASE_SNAPSHOT_PATH", snapshot_path)
+    monkeypatch.setattr(settings, "DATABASE_SNAPSHOT_FALLBACK", True)
+    write_snapshot(ROWS)
+    assert load_snapshot() == ROWS
+
+    down = ReadNode(f"sqlite:///{tmp_path / 'missing' / 'down.db'}")
+    monkeypatch.setattr(db, "get_read_router", lambda: ReadRouter([down]))
+
+    assert [row["DISTRICT"] for row in db.execute_query({"district": "wayanad"})] == ["Wayanad"]
+    assert len(db.fetch_locations()) == 4
+    assert [len(batch) for batch in db.stream_query({"state": "punjab"}, batch_size=2)] == [2, 1]
+
+    monkeypatch.setattr(settings, "DATABASE_SNAPSHOT_FALLBACK", False)
+    assert db.execute_query({"district": "wayanad"}) == []
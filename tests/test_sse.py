@@ -0,0 +1,77 @@
+import sys
+import os
+import asyncio
+import json
+import zlib
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app import services
+from app.api import endpoints
+from app.sse import ChatStream, GzipEventStream, SSEEncoder, parse_last_event_id
+
+def _parse_events(body: str) -> list:
+    events = []
+    for block in body.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if line and not line.startswith(":"))
+        if "data" in fields:
+            events.append((fields.get("id"), json.loads(fields["data"])))
+    return events
+
+def test_encoder_frames_id_and_data():
+    """
+    Tests that events are framed with an id line and a single JSON data line.
+    """
+    frame = SSEEncoder.encode({"type": "answer", "text": "line one\nline two"}, "abc:3").decode()
+
+    assert frame.startswith("id: abc:3\ndata: ")
+    assert frame.endswith("\n\n")
+    assert _parse_events(frame) == [("abc:3", {"type": "answer", "text": "line one\nline two"})]
+    assert parse_last_event_id("abc:3") == ("abc", 3)
+    assert parse_last_event_id("garbage") is None
+
+def test_stream_replays_after_last_event_id():
+    """
+    Tests that a reader starting from a sequence number only receives later events.
+    """
+    async def run():
+        stream = ChatStream("s1")
+        for index in range(4):
+            await stream.append({"type": "status", "n": index})
+        await stream.finish()
+        return [chunk async for chunk in stream.read_from(1)]
+
+    chunks = asyncio.run(run())
+    assert [event["n"] for _, event in _parse_events(b"".join(chunks).decode())] == [2, 3]
+
+def test_gzip_stream_flushes_each_event():
+    """
+    Tests that every compressed event can be decoded as soon as it is received.
+    """
+    gzip_stream = GzipEventStream()
+    decompressor = zlib.decompressobj(31)
+    frame = SSEEncoder.encode({"type": "status"}, "s:0")
+
+    assert decompressor.decompress(gzip_stream.compress(frame)) == frame
+
+def test_chat_endpoint_resumes_with_last_event_id(monkeypatch):
+    """
+    Tests that reconnecting with Last-Event-ID replays the rest of the stream without re-running the pipeline.
+    """
+    nlu_calls = []
+    monkeypatch.setattr(services, "get_json_from_query", lambda q: nlu_calls.append(q) or {"filters": {}})
+    monkeypatch.setattr(services, "execute_query", lambda filters: [])
+    monkeypatch.setattr(services, "get_english_from_data", lambda q, rows: "final answer")
+    app = FastAPI()
+    app.include_router(endpoints.router)
+    client = TestClient(app)
+
+    response = client.post("/chat", json={"session_id": "s", "query": "groundwater in Chennai"})
+    events = _parse_events(response.text)
+    assert events[-2][1] == {"type": "answer", "text": "final answer"}
+    assert events[-1][1] == {"type": "done"}
+
+    resumed = client.post("/chat", json={"session_id": "s", "query": "groundwater in Chennai"}, headers={"Last-Event-ID": events[1][0]})
+    assert resumed.headers["x-stream-id"] == response.headers["x-stream-id"]
+    assert _parse_events(resumed.text) == events[2:]
+    assert nlu_calls == ["groundwater in Chennai"]
@@ -0,0 +1,105 @@
+import sys
+import os
+import asyncio
+import json
+import pytest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import services, timeseries
+from app.services import ChatService
+from app.api.schemas import BatchChatRequest, ChatRequest
+from app.timeseries import _build_trend_query, get_year_range, summarize_trends
+
+SERIES = [
+    {"state": "RAJASTHAN", "district": "Jaipur", "metric": "RainfallTotal", "year": year, "value": value, "delta": None, "growth_rate": None}
+    for year, value in [(2017, 500.0), (2025, 450.0)]
+]
+
+def _stub_trend_pipeline(monkeypatch, trend_calls):
+    monkeypatch.setattr(services, "get_json_from_query", lambda q: {
+        "fields": ["RainfallTotal"], "filters": {"district": "Jaipur", "years": {"from": 2017, "to": 2025}}
+    })
+    monkeypatch.setattr(services, "execute_trend_query", lambda filters, year_range, fields: trend_calls.append((filters, year_range, fields)) or SERIES)
+    monkeypatch.setattr(services, "execute_query", lambda filters: pytest.fail("single-year query used for a trend"))
+    monkeypatch.setattr(services, "execute_batch_query", lambda filters: pytest.fail("trend merged into the batch query"))
+    monkeypatch.setattr(services, "get_english_from_data", lambda q, rows: pytest.fail("single-year NLG used for a trend"))
+    monkeypatch.setattr(services, "get_english_from_trend", lambda q, rows: f"trend of {len(rows)} series")
+
+def test_get_year_range_accepts_dict_and_list():
+    """
+    Tests that the NLU year filter is normalized into an inclusive range.
+    """
+    assert get_year_range({"years": {"from": 2017, "to": 2025}}) == (2017, 2025)
+    assert get_year_range({"years": [2023, 2017, 2020]}) == (2017, 2023)
+    assert get_year_range({"years": {"from": 2020}}) == (2020, 2020)
+    assert get_year_range({"district": "Chennai"}) is None
+    assert get_year_range({"years": "recently"}) is None
+
+def test_summarize_trends_adds_overall_growth():
+    """
+    Tests that per-series summaries carry total change, percent change and CAGR.
+    """
+    rows = [
+        {"state": "TAMILNADU", "district": "Chennai", "metric": "StageofGroundWaterExtractionTotal",
+         "year": year, "value": value, "delta": delta, "growth_rate": None}
+        for year, value, delta in [(2017, 100.0, None), (2019, 110.0, 10.0), (2021, 121.0, 11.0)]
+    ]
+
+    [summary] = summarize_trends(list(reversed(rows)))
+
+    assert [point["year"] for point in summary["points"]] == [2017, 2019, 2021]
+    assert summary["total_change"] == pytest.approx(21.0)
+    assert summary["percent_change"] == pytest.approx(21.0)
+    assert summary["cagr_percent"] == pytest.approx(4.880884817, rel=1e-6)
+
+def test_chat_sends_year_filter_to_series_query(monkeypatch):
+    """
+    Tests that a multi-year question is answered from the series store with the NLU year range.
+    """
+    trend_calls = []
+    _stub_trend_pipeline(monkeypatch, trend_calls)
+
+    async def collect():
+        request = ChatRequest(session_id="t", query="How has rainfall in Jaipur changed since 2017?")
+        return [event async for event in ChatService().stream_events(request)]
+
+    events = asyncio.run(collect())
+    assert events[-1] == {"type": "answer", "text": "trend of 1 series"}
+    assert trend_calls == [({"district": "Jaipur", "years": {"from": 2017, "to": 2025}}, (2017, 2025), ["RainfallTotal"])]
+
+def test_batch_routes_trend_questions_to_series_query(monkeypatch):
+    """
+    Tests that batch items with a year range skip the merged single-year query.
+    """
+    trend_calls = []
+    _stub_trend_pipeline(monkeypatch, trend_calls)
+
+    async def collect():
+        request = BatchChatRequest(session_id="t", queries=["How has rainfall in Jaipur changed since 2017?"])
+        return [json.loads(line) async for line in ChatService().generate_batch_stream(request)]
+
+    items = asyncio.run(collect())
+    assert items[0]["response_text"] == "trend of 1 series"
+    assert [call[1] for call in trend_calls] == [(2017, 2025)]
+
+def test_trend_query_matches_partial_names(monkeypatch):
+    """
+    Tests that a partial place name selects every series an ILIKE '%name%' snapshot read would.
+    """
+    monkeypatch.setattr(timeseries, "get_gazetteer", lambda: {
+        "states": ["KARNATAKA"],
+        "districts": [
+            {"state": "KARNATAKA", "district": "Bengaluru Urban"},
+            {"state": "KARNATAKA", "district": "Bengaluru Rural"},
+            {"state": "KARNATAKA", "district": "Mysuru"},
+        ],
+    })
+
+    sql, params = _build_trend_query({"district": "bengaluru", "state": "Karnataka"}, (2017, 2025), ["RainfallTotal"])
+    assert "lower(district) = ANY(:district_names)" in sql
+    assert params["district_names"] == ["bengaluru rural", "bengaluru urban"]
+    assert params["state_names"] == ["karnataka"]
+
+    # Names the gazetteer does not know (e.g. since renamed) still match as substrings
+    sql, params = _build_trend_query({"district": "Bangalore"}, (2017, 2025), ["RainfallTotal"])
+    assert "district ILIKE :district" in sql
+    assert params["district"] == "%Bangalore%"
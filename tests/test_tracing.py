@@ -0,0 +1,45 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.config import settings
+from app.middleware import _is_admin
+from app.tracing import span, start_trace, end_trace, current_trace
+
+def test_span_is_noop_without_trace():
+    """
+    Tests that spans record nothing when the request is not traced.
+    """
+    assert current_trace() is None
+    with span("chat.nlu"):
+        pass
+    assert current_trace() is None
+
+def test_nested_spans_export_chrome_trace():
+    """
+    Tests that nested spans are exported as complete ('X') Chrome trace events.
+    """
+    trace, token = start_trace("POST /api/v1/chat")
+    try:
+        with span("chat.pipeline"):
+            with span("chat.db", filters={"state": "Karnataka"}):
+                pass
+    finally:
+        end_trace(token)
+
+    events = trace.to_chrome_trace()["traceEvents"]
+    assert [event["name"] for event in events] == ["chat.pipeline", "chat.db"]
+    assert all(event["ph"] == "X" for event in events)
+    outer, inner = events
+    assert outer["ts"] <= inner["ts"]
+    assert inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"]
+    assert inner["args"] == {"filters": {"state": "Karnataka"}}
+    assert current_trace() is None
+
+def test_admin_token_check_rejects_non_ascii_header(monkeypatch):
+    """
+    Tests that a non-ASCII X-Admin-Token is refused instead of raising.
+    """
+    monkeypatch.setattr(settings, "ADMIN_API_TOKEN", "s3cret")
+    assert _is_admin({"x-admin-token": "s3cret"})
+    assert not _is_admin({"x-admin-token": "s3cr\xe9t"})
+    assert not _is_admin({})
@@ -0,0 +1,107 @@
+import sys
+import os
+import asyncio
+import json
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app import services
+from app.api import websocket
+from app.config import settings
+from app.services import ChatService
+
+def _client(monkeypatch):
+    monkeypatch.setattr(services, "get_json_from_query", lambda q: {"filters": {"district": q}})
+    monkeypatch.setattr(services, "execute_query", lambda filters: [{"DISTRICT": filters["district"]}])
+    monkeypatch.setattr(services, "get_english_from_data", lambda q, rows: f"answer for {q}")
+    monkeypatch.setattr(services.asyncio, "sleep", _no_sleep)
+    app = FastAPI()
+    app.include_router(websocket.router)
+    return TestClient(app)
+
+_real_sleep = asyncio.sleep
+
+async def _no_sleep(seconds):
+    # Skip the pipeline's short UX pauses but keep the keepalive interval
+    if seconds >= 1:
+        await _real_sleep(seconds)
+
+def test_websocket_multiplexes_conversations(monkeypatch):
+    """
+    Tests that two conversations on one connection each receive their own answer and done event.
+    """
+    with _client(monkeypatch).websocket_connect("/ws/chat") as ws:
+        assert ws.receive_json()["type"] == "ready"
+        ws.send_json({"type": "chat", "id": "a", "session_id": "s", "query": "Chennai"})
+        ws.send_json({"type": "chat", "id": "b", "session_id": "s", "query": "Pune"})
+
+        events = {"a": [], "b": []}
+        done = set()
+        while done != {"a", "b"}:
+            event = ws.receive_json()
+            events[event["id"]].append(event)
+            if event["type"] == "done":
+                done.add(event["id"])
+
+    assert {"type": "answer", "id": "a", "text": "answer for Chennai"} in events["a"]
+    assert {"type": "answer", "id": "b", "text": "answer for Pune"} in events["b"]
+
+def test_websocket_rejects_invalid_messages(monkeypatch):
+    """
+    Tests that protocol errors are reported without closing the connection.
+    """
+    with _client(monkeypatch).websocket_connect("/ws/chat") as ws:
+        ws.receive_json()
+        ws.send_text("not json")
+        assert ws.receive_json()["type"] == "error"
+        ws.send_json({"type": "chat", "id": "x", "session_id": "s", "query": "drop table"})
+        error = ws.receive_json()
+        assert (error["type"], error["id"], error["text"]) == ("error", "x", "Invalid chat request")
+        ws.send_json({"type": "ping"})
+        assert ws.receive_json() == {"type": "pong"}
+
+class StalledSocket:
+    """A client that sends the given messages but never reads what it is sent."""
+
+    def __init__(self, messages):
+        self.incoming = asyncio.Queue()
+        for message in messages:
+            self.incoming.put_nowait(json.dumps(message))
+        self.reading = asyncio.Event()
+
+    async def receive_text(self):
+        return await self.incoming.get()
+
+    async def send_text(self, text):
+        await self.reading.wait()
+
+def test_reader_handles_cancel_while_send_buffer_is_full(monkeypatch):
+    """
+    Tests that a client that stopped reading can still cancel, and gets pongs queued, while events back up.
+    """
+    monkeypatch.setattr(settings, "WS_SEND_BUFFER", 1)
+
+    async def chatty_events(self, request):
+        for index in range(100):
+            yield {"type": "status", "message": f"step {index}"}
+    monkeypatch.setattr(ChatService, "stream_events", chatty_events)
+
+    async def run():
+        socket = StalledSocket([{"type": "chat", "id": "a", "session_id": "s", "query": "Pune"}])
+        connection = websocket.ChatConnection(socket)
+        runner = asyncio.create_task(connection.run())
+        await asyncio.sleep(0.05)
+        conversation = connection.conversations["a"]
+        assert connection.send_buffer.full()
+
+        socket.incoming.put_nowait(json.dumps({"type": "ping"}))
+        socket.incoming.put_nowait(json.dumps({"type": "cancel", "id": "a"}))
+        await asyncio.sleep(0.05)
+        replies = [connection.control_buffer.get_nowait() for _ in range(connection.control_buffer.qsize())]
+        runner.cancel()
+        return conversation, replies
+
+    conversation, replies = asyncio.run(run())
+    assert conversation.cancelled()
+    assert {"type": "pong"} in replies
+    assert {"type": "cancelled", "id": "a"} in replies